@@ -1,7 +1,10 @@
 from abc import ABCMeta, abstractmethod
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 
-from cache import LineDataWayCache, VictimCache
+import numpy as np
+
+from cache import LineDataWayCache, VictimCache, FullyAssociativeCache
+from lru_module import NwayLRU, ArrayLRU
 
 
 class Action:
@@ -9,6 +12,7 @@ class Action:
     index_type_action = {}
     counted_action = defaultdict(int)
     counted_miss = 0
+    counted_victim_hit = 0  # misses of the cache served by the victim cache, not counted as misses
 
     def __init__(self, tag: int, index: int, offset: int):
         self.tag = tag
@@ -32,6 +36,7 @@ class Action:
         cls.index_type_action = {}
         cls.counted_action = defaultdict(int)
         cls.counted_miss = 0
+        cls.counted_victim_hit = 0
     # end
 
     @classmethod
@@ -39,6 +44,11 @@ class Action:
         cls.counted_miss += 1
     # end
 
+    @classmethod
+    def add_victim_hit(cls):
+        cls.counted_victim_hit += 1
+    # end
+
     @classmethod
     def get_miss_count(cls):
         return cls.counted_miss
@@ -97,7 +107,7 @@ class LoadAction(Action):
         indicate_victim, indicate_victim_least = victim.lookup(self.tag)
         if victim.is_a_miss(indicate_victim):
             tag_removed = cache.store_direct(self.index, self.offset, self.tag, indicate_least) # -> update lru
-            if tag_removed:
+            if tag_removed is not None:
                 victim.store_direct(tag_removed, indicate_victim_least)                             # -> update lru
             # end
             Action.add_miss()
@@ -105,6 +115,7 @@ class LoadAction(Action):
         # end
 
         victim.touch(indicate_victim)
+        Action.add_victim_hit()
     # end
 # end
 
@@ -133,7 +144,7 @@ class StoreAction(Action):
         indicate_victim, indicate_victim_least = victim.lookup(self.tag)
         if victim.is_a_miss(indicate_victim):
             tag_removed = cache.store_direct(self.index, self.offset, self.tag, indicate_least) # -> update lru
-            if tag_removed:         # swiped out
+            if tag_removed is not None:         # swiped out
                 victim.store_direct(tag_removed, indicate_victim_least)                             # -> update lru
             # end
             Action.add_miss()
@@ -141,5 +152,436 @@ class StoreAction(Action):
         # end
 
         victim.touch(indicate_victim)
+        Action.add_victim_hit()
+    # end
+# end
+
+
+class ActionStats:
+    # instance-scoped twin of the Action class counters, one per simulated cache
+
+    def __init__(self, num_set=0):
+        self.counted_action = defaultdict(int)
+        self.counted_miss = 0
+        self.counted_victim_hit = 0
+
+        # traffic to the next level, only counted when a write policy is modeled
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.counted_writeback = 0
+
+        # per set counts, only kept when asked for (num_set > 0)
+        self.counted_access_set = np.zeros(num_set, dtype=np.int64) if num_set else None
+        self.counted_miss_set = [0] * num_set if num_set else None
+    # end
+
+    def count_all(self):
+        return sum(self.counted_action.values())
+    # end
+
+    def count_hit(self):
+        return self.count_all() - self.counted_miss
+    # end
+# end
+
+
+class BatchExecutor:
+    # runs LoadAction/StoreAction logic over decoded (ops, tags, indexes) arrays without building
+    # one Action per access. With an LRU cache (either backend) the sets live in plain python
+    # structures while executing, call sync() before reading cache/victim again.
+
+    INDICATE_EMPTY = -1
+    SIZE_WORD_B = 4     # bytes written through by one store, the trace has no access size
+
+    WRITE_POLICY_VALID = ['wb', 'wt']   # write-back / write-through
+
+    def __init__(self, cache: LineDataWayCache, victim: VictimCache = None, count_set=False, write_policy=None, write_allocate=True):
+        self.cache = cache
+        self.victim = victim
+        self.stats = ActionStats(cache.shape()[0] if count_set else 0)
+
+        # None: stores are plain accesses like LoadAction/StoreAction, no dirty bits and no traffic
+        if write_policy is not None and write_policy not in self.__class__.WRITE_POLICY_VALID:
+            raise ValueError('unknown write policy: {}'.format(write_policy))
+        # end
+        self.write_policy = write_policy
+        self.write_allocate = write_allocate
+
+        # a prefetcher fills blocks of any set through store_direct, only the generic path drives it
+        if cache.prefetcher is not None and victim is not None:
+            raise ValueError('prefetching into a cache with a victim cache is not modeled')
+        # end
+        self.bits_index = (cache.shape()[0] - 1).bit_length()
+
+        klasses_lru = (NwayLRU, ArrayLRU)
+        self.is_fast = (type(cache) is FullyAssociativeCache or (type(cache) is LineDataWayCache and isinstance(cache.lru, klasses_lru))) and write_policy is None and cache.prefetcher is None
+        self.is_fast = self.is_fast and (victim is None or (type(victim) is VictimCache and isinstance(victim.lru, klasses_lru)))
+
+        # cache: per set, tag -> way ordered from least to most + empty ways (pop() -> least)
+        self.entries_set = [None] * cache.shape()[0]
+        self.ways_empty_set = [None] * cache.shape()[0]
+
+        # victim: tags can repeat (tags of different sets), so keep way -> tag, tag -> ways and the way order
+        self.tags_victim = None
+        self.ways_tag_victim = None
+        self.order_victim = None
     # end
-# end
\ No newline at end of file
+
+    def execute(self, ops, tags, indexes):
+        ops = np.asarray(ops)
+        for op, count in zip(*np.unique(ops, return_counts=True)):
+            self.stats.counted_action[Action.get_action_klass(chr(op)).__name__] += int(count)
+        # end
+        if self.stats.counted_access_set is not None:
+            self.stats.counted_access_set += np.bincount(indexes, minlength=self.stats.counted_access_set.size)
+        # end
+        if self.cache.instrument is not None:
+            self.cache.instrument.record_accesses(tags, indexes)
+        # end
+
+        if self.is_fast:
+            self._execute_fast(*self.__class__.collapse_runs(tags, indexes))
+        else:
+            self._execute_generic(ops, tags, indexes)
+        # end
+    # end
+
+    @staticmethod
+    def collapse_runs(tags, indexes):
+        # -> (tags, indexes, repeats): consecutive accesses to the same block become one access followed
+        # by `repeats` more. With LRU and allocation on every miss the repeats always find the block where
+        # the first access left it: the cache (hit or fill, already most recent) or the victim cache
+        tags = np.asarray(tags)
+        indexes = np.asarray(indexes)
+        is_start = np.ones(tags.size, dtype=np.bool_)
+        is_start[1:] = (tags[1:] != tags[:-1]) | (indexes[1:] != indexes[:-1])
+
+        starts = np.flatnonzero(is_start)
+        repeats = np.diff(np.append(starts, tags.size)) - 1
+        return tags[starts], indexes[starts], repeats
+    # end
+
+    def _execute_generic(self, ops, tags, indexes):
+        cache = self.cache
+        victim = self.victim
+        op_store = OP_STORE
+        counted_miss_set = self.stats.counted_miss_set
+        count_miss = 0
+        count_victim_hit = 0
+
+        is_write_modeled = self.write_policy is not None
+        is_write_back = self.write_policy == 'wb'
+        is_write_allocate = self.write_allocate
+        size_block_b = cache.size_data_cache_b
+        size_word_b = self.__class__.SIZE_WORD_B
+        bytes_read = 0
+        bytes_written = 0
+        count_writeback = 0
+
+        # prefetches asked by an access are filled before the next one, once the access is done
+        prefetcher = cache.prefetcher
+        ways_prefetched = prefetcher.ways_prefetched if prefetcher is not None else None
+        bits_index = self.bits_index
+        blocks_prefetch = None
+
+        for op, tag, index in zip(ops.tolist(), tags.tolist(), indexes.tolist()):
+            if blocks_prefetch:
+                self._prefetch(blocks_prefetch)
+                blocks_prefetch = None
+            # end
+
+            is_store = op == op_store
+            indicate_target, indicate_least = cache.lookup(index, 0, tag)
+            if not cache.is_a_miss(indicate_target):
+                if ways_prefetched is not None and (index, indicate_target) in ways_prefetched:
+                    ways_prefetched.discard((index, indicate_target))
+                    prefetcher.stats.useful += 1
+                    blocks_prefetch = prefetcher.on_access((tag << bits_index) | index, False)
+                # end
+
+                if is_store:
+                    cache.store_direct(index, 0, tag, indicate_target)
+                    if is_write_back:
+                        cache.set_dirty(index, indicate_target)
+                    elif is_write_modeled:
+                        bytes_written += size_word_b
+                    # end
+                else:
+                    cache.touch(index, indicate_target)
+                # end
+                continue
+            # end
+
+            if victim is not None:
+                indicate_victim, indicate_victim_least = victim.lookup(tag)
+                if not victim.is_a_miss(indicate_victim):
+                    victim.touch(indicate_victim)
+                    count_victim_hit += 1
+                    if is_store and is_write_back:
+                        victim.set_dirty(indicate_victim)
+                    elif is_store and is_write_modeled:
+                        bytes_written += size_word_b
+                    # end
+                    continue
+                # end
+            # end
+
+            count_miss += 1
+            if counted_miss_set is not None:
+                counted_miss_set[index] += 1
+            # end
+            if prefetcher is not None:
+                block = (tag << bits_index) | index
+                if block in prefetcher.blocks_evicted:
+                    prefetcher.blocks_evicted.discard(block)
+                    prefetcher.stats.pollution_misses += 1
+                # end
+                blocks_prefetch = prefetcher.on_access(block, True)
+            # end
+
+            if is_store and is_write_modeled and not is_write_allocate:     # write around the cache
+                bytes_written += size_word_b
+                continue
+            # end
+
+            if ways_prefetched is not None and (index, indicate_least) in ways_prefetched:
+                ways_prefetched.discard((index, indicate_least))
+                prefetcher.stats.unused += 1
+            # end
+            is_dirty_removed = is_write_back and cache.is_dirty(index, indicate_least)
+            tag_removed = cache.store_direct(index, 0, tag, indicate_least)
+            if is_write_modeled:
+                bytes_read += size_block_b
+                if is_store and is_write_back:
+                    cache.set_dirty(index, indicate_least)
+                elif is_store:
+                    bytes_written += size_word_b
+                # end
+            # end
+
+            if tag_removed is None:
+                continue
+            # end
+
+            if victim is not None:
+                is_dirty_removed_victim = is_write_back and victim.is_dirty(indicate_victim_least)
+                victim.store_direct(tag_removed, indicate_victim_least)
+                if is_write_back:
+                    victim.set_dirty(indicate_victim_least, is_dirty_removed)
+                # end
+                is_dirty_removed = is_dirty_removed_victim
+            # end
+
+            if is_dirty_removed:
+                count_writeback += 1
+                bytes_written += size_block_b
+            # end
+        # end
+        if blocks_prefetch:
+            self._prefetch(blocks_prefetch)
+        # end
+
+        self.stats.counted_miss += count_miss
+        self.stats.counted_victim_hit += count_victim_hit
+        self.stats.bytes_read += bytes_read
+        self.stats.bytes_written += bytes_written
+        self.stats.counted_writeback += count_writeback
+    # end
+
+    def _prefetch(self, blocks):
+        cache = self.cache
+        prefetcher = cache.prefetcher
+        ways_prefetched = prefetcher.ways_prefetched
+        bits_index = self.bits_index
+        mask_index = (1 << bits_index) - 1
+        bits_block = bits_index + cache.bits_tag
+        is_write_back = self.write_policy == 'wb'
+        size_block_b = cache.size_data_cache_b
+
+        for block in blocks:
+            if block < 0 or block >> bits_block:    # out of the address space
+                continue
+            # end
+
+            tag, index = block >> bits_index, block & mask_index
+            indicate_target, indicate_least = cache.lookup(index, 0, tag)
+            if not cache.is_a_miss(indicate_target):
+                continue
+            # end
+
+            is_demand_removed = (index, indicate_least) not in ways_prefetched
+            if not is_demand_removed:
+                prefetcher.stats.unused += 1
+            # end
+            is_dirty_removed = is_write_back and cache.is_dirty(index, indicate_least)
+
+            tag_removed = cache.store_direct(index, 0, tag, indicate_least)
+            if tag_removed is not None and is_demand_removed:
+                prefetcher.stats.pollution += 1
+                prefetcher.blocks_evicted.add((int(tag_removed) << bits_index) | index)
+            # end
+            prefetcher.blocks_evicted.discard(block)
+            ways_prefetched.add((index, indicate_least))
+            prefetcher.stats.issued += 1
+
+            if self.write_policy is not None:
+                self.stats.bytes_read += size_block_b
+            # end
+            if is_dirty_removed:
+                self.stats.counted_writeback += 1
+                self.stats.bytes_written += size_block_b
+            # end
+        # end
+    # end
+
+    def _execute_fast(self, tags, indexes, repeats):
+        entries_set = self.entries_set
+        ways_empty_set = self.ways_empty_set
+        load_set = self._load_set
+
+        if self.victim is not None and self.tags_victim is None:
+            self._load_victim()
+        # end
+        tags_victim = self.tags_victim
+        ways_tag_victim = self.ways_tag_victim
+        order_victim = self.order_victim
+        indicate_empty = self.__class__.INDICATE_EMPTY
+        counted_miss_set = self.stats.counted_miss_set
+        evictions_set = self.cache.instrument.evictions_set if self.cache.instrument is not None else None
+        count_miss = 0
+        count_victim_hit = 0
+
+        for tag, index, repeat in zip(tags.tolist(), indexes.tolist(), repeats.tolist()):
+            entries = entries_set[index]
+            if entries is None:
+                entries = load_set(index)
+            # end
+
+            if tag in entries:      # hit, load or store both only refresh the line
+                entries.move_to_end(tag)
+                continue
+            # end
+
+            if tags_victim is not None:
+                ways_victim = ways_tag_victim.get(tag)
+                if ways_victim:
+                    order_victim.move_to_end(min(ways_victim))     # first matching way, as lookup
+                    count_victim_hit += 1 + repeat                  # the block stays in the victim cache
+                    continue
+                # end
+            # end
+
+            ways_empty = ways_empty_set[index]
+            if ways_empty:
+                entries[tag] = ways_empty.pop()
+                tag_removed = None
+            else:
+                tag_removed, way = entries.popitem(last=False)
+                entries[tag] = way
+                if evictions_set is not None:
+                    evictions_set[index] += 1
+                # end
+            # end
+
+            if tags_victim is not None and tag_removed is not None:
+                way_victim = next(iter(order_victim))
+                tag_old = tags_victim[way_victim]
+                if tag_old != indicate_empty:
+                    ways_victim = ways_tag_victim[tag_old]
+                    ways_victim.remove(way_victim)
+                    if not ways_victim:
+                        del ways_tag_victim[tag_old]
+                    # end
+                # end
+                tags_victim[way_victim] = tag_removed
+                ways_tag_victim.setdefault(tag_removed, []).append(way_victim)
+                order_victim.move_to_end(way_victim)
+            # end
+            count_miss += 1
+            if counted_miss_set is not None:
+                counted_miss_set[index] += 1
+            # end
+        # end
+
+        self.stats.counted_miss += count_miss
+        self.stats.counted_victim_hit += count_victim_hit
+    # end
+
+    def _load_set(self, index):
+        cache = self.cache
+        if type(cache) is FullyAssociativeCache:    # already kept in the fast path shape, work on it in place
+            self.entries_set[index] = cache.entries
+            self.ways_empty_set[index] = cache.ways_empty
+            return cache.entries
+        # end
+
+        order = cache.lru.get_order(index)
+        tags_way = cache.cache[index].tolist()
+        valids_way = cache.valid[index].tolist()
+
+        entries = OrderedDict((tags_way[way], way) for way in order if valids_way[way])
+        self.entries_set[index] = entries
+        self.ways_empty_set[index] = [way for way in reversed(order) if not valids_way[way]]
+        return entries
+    # end
+
+    def _load_victim(self):
+        victim = self.victim
+        index = VictimCache.INDEX_VICTIM_DEFAULT
+        valids_way = victim.valid[index].tolist()
+
+        self.tags_victim = [tag if valid else self.__class__.INDICATE_EMPTY for tag, valid in zip(victim.cache[index].tolist(), valids_way)]
+        self.order_victim = OrderedDict.fromkeys(victim.lru.get_order(index))
+
+        self.ways_tag_victim = {}
+        for way, tag in enumerate(self.tags_victim):
+            if tag != self.__class__.INDICATE_EMPTY:
+                self.ways_tag_victim.setdefault(tag, []).append(way)
+            # end
+        # end
+    # end
+
+    def sync(self):
+        # write the python side state back into the cache/victim arrays and their LRU
+        if not self.is_fast:
+            return
+        # end
+
+        cache = self.cache
+        for index, entries in enumerate(self.entries_set):
+            if entries is None:
+                continue
+            # end
+            if type(cache) is FullyAssociativeCache:
+                cache.rebuild_index(index)
+                continue
+            # end
+
+            ways_empty = self.ways_empty_set[index]
+            cache.valid[index][ways_empty] = False
+            for tag, way in entries.items():
+                cache.cache[index][way] = tag
+                cache.valid[index][way] = True
+            # end
+            cache.lru.set_order(index, list(reversed(ways_empty)) + list(entries.values()))
+            cache.rebuild_index(index)
+        # end
+
+        if self.tags_victim is not None:
+            victim = self.victim
+            index = VictimCache.INDEX_VICTIM_DEFAULT
+            for way, tag in enumerate(self.tags_victim):
+                if tag != self.__class__.INDICATE_EMPTY:
+                    victim.cache[index][way] = tag
+                # end
+                victim.valid[index][way] = tag != self.__class__.INDICATE_EMPTY
+            # end
+            victim.lru.set_order(index, list(self.order_victim))
+            victim.rebuild_index(index)
+        # end
+    # end
+# end
+
+
+OP_LOAD = ord(LoadAction.register_action())
+OP_STORE = ord(StoreAction.register_action())
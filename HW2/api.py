@@ -0,0 +1,121 @@
+import os
+import time
+import threading
+import numpy as np
+from collections import OrderedDict
+from dataclasses import replace
+
+from main import Config, Result, Simulation
+from memtrace import read_trace, parse_binary, NUM_LINE_CHUNK_DEFAULT
+from prefetch import Prefetcher
+
+
+# library entry point: simulate(trace, configs) -> list[Result], nothing printed, nothing exited.
+# A trace is one of
+#   - a path (text or binary memtrace, may be compressed), read and parsed once and kept decoded
+#     (up to NUM_TRACE_CACHED traces, least recently used dropped) until the file changes
+#   - (ops, addresses) arrays as parse_batch/read_trace give them
+#   - a binary memtrace in memory (bytes, bytearray, memoryview)
+# Every call builds its own caches and executors, so calls can run from several threads at once.
+# The action engine counts on the Action class, its simulations take LOCK_ACTION one at a time.
+
+NUM_TRACE_CACHED = 8
+LOCK_ACTION = threading.Lock()
+
+lock_traces = threading.Lock()
+traces_cached = OrderedDict()   # (path, mtime, size) -> (ops, addresses), least -> most recent
+
+# fill the lazy registries now, not from two threads at once
+Prefetcher.list_prefetchers()
+
+
+def load_trace(trace):
+    # -> (ops, addresses, name used as Result.i)
+    if isinstance(trace, (str, os.PathLike)):
+        path = os.fspath(trace)
+        status = os.stat(path)
+        key = (os.path.realpath(path), status.st_mtime_ns, status.st_size)
+        with lock_traces:
+            if key in traces_cached:
+                traces_cached.move_to_end(key)
+                return (*traces_cached[key], path)
+            # end
+        # end
+
+        ops, addresses = read_trace(path)   # outside the lock, other traces keep being served
+        with lock_traces:
+            traces_cached[key] = (ops, addresses)
+            while len(traces_cached) > NUM_TRACE_CACHED:
+                traces_cached.popitem(last=False)
+            # end
+        # end
+        return ops, addresses, path
+    # end
+
+    if isinstance(trace, (bytes, bytearray, memoryview)):
+        records = parse_binary(trace)
+        return records['op'], records['address'], '<binary>'
+    # end
+
+    ops, addresses = trace
+    ops, addresses = np.asarray(ops, dtype=np.uint8), np.asarray(addresses, dtype=np.uint32)
+    if ops.shape != addresses.shape or ops.ndim != 1:
+        raise ValueError('ops and addresses must be 1-d arrays of the same length')
+    # end
+    return ops, addresses, '<arrays>'
+# end
+
+
+def clear_traces():
+    with lock_traces:
+        traces_cached.clear()
+    # end
+# end
+
+
+def simulate(trace, configs, num_record_chunk=NUM_LINE_CHUNK_DEFAULT) -> list[Result]:
+    # one Result per config, in order; the trace is decoded once for all of them. Config.i is
+    # replaced by the trace's name, the options run() drives itself (jobs, checkpoints, progress) are refused
+    configs = [configs] if isinstance(configs, Config) else list(configs)
+    for config in configs:
+        if config.jobs > 1 or config.checkpoint or config.resume or config.stop_at or config.progress:
+            raise ValueError('simulate() does not take jobs, checkpoint, resume, stop_at or progress')
+        # end
+    # end
+    if not configs:
+        return []
+    # end
+
+    ops, addresses, name = load_trace(trace)
+    configs = [replace(config, i=name) for config in configs]
+    configs_batch = [config for config in configs if config.engine == 'batch']
+    configs_action = [config for config in configs if config.engine != 'batch']
+
+    results_config = {}
+    results_config.update(zip(map(id, configs_batch), run_simulations(configs_batch, ops, addresses, num_record_chunk)))
+    for config in configs_action:
+        with LOCK_ACTION:
+            results_config[id(config)] = run_simulations([config], ops, addresses, num_record_chunk)[0]
+        # end
+    # end
+    return [results_config[id(config)] for config in configs]
+# end
+
+
+def run_simulations(configs, ops, addresses, num_record_chunk) -> list[Result]:
+    # the loop of main.run_many, over arrays instead of a file
+    if not configs:
+        return []
+    # end
+
+    time_start = time.perf_counter()
+    simulations = [Simulation(config) for config in configs]
+    for start in range(0, ops.size, num_record_chunk):
+        ops_chunk, addresses_chunk = ops[start:start + num_record_chunk], addresses[start:start + num_record_chunk]
+        for simulation in simulations:
+            simulation.feed(ops_chunk, addresses_chunk)
+        # end
+    # end
+    time_wall = time.perf_counter() - time_start
+    return [simulation.finish(time_wall) for simulation in simulations]
+# end
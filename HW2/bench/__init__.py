@@ -0,0 +1,2 @@
+# benchmark suite: synthetic memtraces (synth) and a per-phase throughput harness (harness)
+# run from HW2/: python -m bench -h
@@ -0,0 +1,95 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+
+from bench.synth import GENERATORS, generate_trace, write_trace
+from bench.harness import ENGINES, measure_isolated, find_regressions
+from policy_module import ReplacementPolicy
+
+
+def generate_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m bench',
+        description='Throughput of main.py and cache_sim.py on synthetic memtraces, per phase',
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+
+    parser.add_argument('-patterns', type=str, nargs='+', choices=list(GENERATORS), default=list(GENERATORS), help='Access patterns')
+    parser.add_argument('-sizes', type=int, nargs='+', default=[10000, 100000], help='Trace lengths (accesses)')
+    parser.add_argument('-engines', type=str, nargs='+', choices=ENGINES, default=ENGINES, help='Engines, main-action: Action + NwayLRU, main-batch: BatchExecutor, cache_sim: LRUSet lists')
+    parser.add_argument('-cs', type=int, default=64, help='Total Cache Size(KB)')
+    parser.add_argument('-bs', type=int, default=16, help='Cache Block Size(B)')
+    parser.add_argument('-w', type=int, default=4, help='Number of Ways')
+    parser.add_argument('-rp', type=str, choices=['lru', *ReplacementPolicy.list_policies()], default='lru', help='Replacement policy of the main engines')
+    parser.add_argument('-seed', type=int, default=0, help='Seed of the synthetic traces')
+    parser.add_argument('-d', type=str, help='(Optional) Directory to keep the traces in, default: a temporary one')
+    parser.add_argument('-o', type=str, help='(Optional) Write every measurement to this json')
+    parser.add_argument('--baseline', type=str, help='(Optional) Fail when accesses/sec drops below this stored baseline')
+    parser.add_argument('--save-baseline', type=str, help='(Optional) Store the accesses/sec of this run as a baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='(Optional) Allowed throughput drop against the baseline, default 0.2')
+
+    return parser
+# end
+
+
+def main(argv):
+    args = generate_parser().parse_known_args(argv)[0]
+
+    with tempfile.TemporaryDirectory() as path_tmp:
+        path_dir = args.d if args.d else path_tmp
+        os.makedirs(path_dir, exist_ok=True)
+
+        rows = []
+        print('{:<28} {:>12} {:>9} {:>9} {:>9} {:>12} {:>10}'.format('trace', 'engine', 'parse', 'decode', 'simulate', 'accesses/s', 'peak MB'))
+        for pattern in args.patterns:
+            for size in args.sizes:
+                name_trace = '{}-{}.memtrace'.format(pattern, size)
+                path_trace = os.path.join(path_dir, name_trace)
+                if not os.path.exists(path_trace):
+                    write_trace(path_trace, *generate_trace(pattern, size, args.seed), seed=args.seed)
+                # end
+
+                for engine in args.engines:
+                    row = measure_isolated(engine, path_trace, args.cs, args.bs, args.w, args.rp)
+                    key_engine = engine if engine == 'cache_sim' or args.rp == 'lru' else '{}-{}'.format(engine, args.rp)
+                    row.update(trace=name_trace, key='{}/{}'.format(key_engine, name_trace))
+                    rows.append(row)
+                    print('{:<28} {:>12} {:>8.3f}s {:>8.3f}s {:>8.3f}s {:>12.0f} {:>10.1f}'.format(
+                        name_trace, engine, row['time_parse'], row['time_decode'], row['time_simulate'], row['accesses_per_sec'], row['peak_rss_b'] / 2**20))
+                # end
+            # end
+        # end
+    # end
+
+    if args.o:
+        with open(args.o, 'w') as file:
+            json.dump(rows, file, indent=2)
+        # end
+    # end
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as file:
+            json.dump({row['key']: row['accesses_per_sec'] for row in rows}, file, indent=2)
+        # end
+    # end
+
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)
+        # end
+
+        regressions = find_regressions(rows, baseline, args.tolerance)
+        for key, rate_baseline, rate in regressions:
+            print('REGRESSION {}: {:.0f} -> {:.0f} accesses/s'.format(key, rate_baseline, rate))
+        # end
+        if regressions:
+            sys.exit(1)
+        # end
+    # end
+# end
+
+if __name__ == "__main__":
+    main(sys.argv)
+# end
@@ -0,0 +1,141 @@
+import sys
+import time
+import resource
+import multiprocessing
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+
+from actions import Action, BatchExecutor
+from factory import generate_components
+from memtrace import read_chunks
+import cache_sim
+
+
+# every engine is timed per phase (parse: text -> addresses, decode: address -> tag/index,
+# simulate: cache update) in a fresh process, so the peak RSS belongs to that run only
+
+ENGINES = ['main-action', 'main-batch', 'cache_sim']
+NUM_LINE_CHUNK = 1 << 16
+
+
+def _peak_rss_b():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024     # darwin reports bytes, linux KB
+# end
+
+
+def _time_main(path, cs, bs, w, engine, policy='lru'):
+    times = {'parse': 0.0, 'decode': 0.0, 'simulate': 0.0}
+    lru = 'chain' if engine == 'main-action' else 'array'
+    cache, victim, decoder = generate_components(cs, bs, w, lru=lru, policy=policy)
+    executor = BatchExecutor(cache, victim)
+    Action.clear_state()
+
+    chunks = read_chunks(path, NUM_LINE_CHUNK)
+    while True:
+        time_start = time.perf_counter()
+        chunk = next(chunks, None)
+        times['parse'] += time.perf_counter() - time_start
+        if chunk is None:
+            break
+        # end
+
+        time_start = time.perf_counter()
+        ops, tags, indexes, offsets = decoder.decode_addresses(*chunk)
+        times['decode'] += time.perf_counter() - time_start
+
+        time_start = time.perf_counter()
+        if engine == 'main-action':
+            for action in decoder.generate_actions(ops, tags, indexes, offsets):
+                action.execute(cache, victim)
+            # end
+        else:
+            executor.execute(ops, tags, indexes)
+        # end
+        times['simulate'] += time.perf_counter() - time_start
+    # end
+    executor.sync()
+
+    if engine == 'main-action':
+        count_all, count_miss = sum(Action.counted_action.values()), Action.counted_miss
+        Action.clear_state()
+    else:
+        count_all, count_miss = executor.stats.count_all(), executor.stats.counted_miss
+    # end
+    return times, count_all, count_miss
+# end
+
+
+def _time_cache_sim(path, cs, bs, w):
+    times = {'parse': 0.0, 'decode': 0.0, 'simulate': 0.0}
+    cache = cache_sim.Cache(cs, bs, w)
+
+    with open(path, 'r') as file:
+        while True:
+            time_start = time.perf_counter()
+            lines = list(islice(file, NUM_LINE_CHUNK))
+            addresses = [address for op, _, address in map(cache_sim.parse_trace_line, lines) if op]
+            times['parse'] += time.perf_counter() - time_start
+            if not lines:
+                break
+            # end
+
+            time_start = time.perf_counter()
+            splits = [cache._split_address(address & 0xFFFFFFFF) for address in addresses]
+            times['decode'] += time.perf_counter() - time_start
+
+            time_start = time.perf_counter()
+            sets = cache.sets
+            for tag, index, _ in splits:
+                hit = sets[index].access(tag)
+                cache.hits += int(hit)
+                cache.misses += int(not hit)
+                cache.accesses += 1
+            # end
+            times['simulate'] += time.perf_counter() - time_start
+        # end
+    # end
+    return times, cache.accesses, cache.misses
+# end
+
+
+def measure(engine, path, cs, bs, w, policy='lru') -> dict:
+    # policy only applies to the main engines, cache_sim is always lru
+    if engine == 'cache_sim':
+        times, count_all, count_miss = _time_cache_sim(path, cs, bs, w)
+    else:
+        times, count_all, count_miss = _time_main(path, cs, bs, w, engine, policy)
+    # end
+
+    time_total = sum(times.values())
+    return {
+        'engine': engine,
+        'accesses': count_all,
+        'misses': count_miss,
+        'time_parse': times['parse'],
+        'time_decode': times['decode'],
+        'time_simulate': times['simulate'],
+        'accesses_per_sec': count_all / time_total if time_total else 0.0,
+        'peak_rss_b': _peak_rss_b()
+    }
+# end
+
+
+def measure_isolated(engine, path, cs, bs, w, policy='lru') -> dict:
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(measure, engine, path, cs, bs, w, policy).result()
+    # end
+# end
+
+
+def find_regressions(rows, baseline, tolerance):
+    # -> keys whose throughput dropped more than tolerance below the baseline
+    regressions = []
+    for row in rows:
+        rate_baseline = baseline.get(row['key'])
+        if rate_baseline and row['accesses_per_sec'] < rate_baseline * (1 - tolerance):
+            regressions.append((row['key'], rate_baseline, row['accesses_per_sec']))
+        # end
+    # end
+    return regressions
+# end
@@ -0,0 +1,68 @@
+import numpy as np
+
+
+# reproducible synthetic memtraces in the same 'L <offset> <hex>' format as the gcc traces:
+# every generator returns 32-bit-safe byte addresses, write_trace splits them into offset + hex
+
+ADDRESS_BASE_DEFAULT = 0x7fffe7ff000     # 44 bits like the gcc traces
+OFFSETS_PATCH = np.array([0, 0, 0, 0, -8, 16, -200], dtype=np.int64)
+FRACTION_STORE_DEFAULT = 0.3
+
+
+def generate_sequential(num_access, rng, stride=4):
+    return np.arange(num_access, dtype=np.int64) * stride
+# end
+
+
+def generate_strided(num_access, rng, stride=256, size_region=1 << 20):
+    return (np.arange(num_access, dtype=np.int64) * stride) % size_region
+# end
+
+
+def generate_uniform(num_access, rng, size_region=1 << 22):
+    return rng.integers(0, size_region // 4, size=num_access, dtype=np.int64) * 4
+# end
+
+
+def generate_zipf(num_access, rng, num_block=1 << 16, size_block=64, a=1.2):
+    # block ranks follow zipf(a), shuffled so hot blocks spread over the sets
+    ranks = np.minimum(rng.zipf(a, size=num_access), num_block) - 1
+    blocks = rng.permutation(num_block)[ranks]
+    return blocks.astype(np.int64) * size_block + rng.integers(0, size_block // 4, size=num_access) * 4
+# end
+
+
+def generate_loop(num_access, rng, size_working_set=48 * 1024, stride=8):
+    return (np.arange(num_access, dtype=np.int64) * stride) % size_working_set
+# end
+
+
+GENERATORS = {
+    'sequential': generate_sequential,
+    'strided': generate_strided,
+    'uniform': generate_uniform,
+    'zipf': generate_zipf,
+    'loop': generate_loop,
+}
+
+
+def generate_trace(pattern, num_access, seed=0, address_base=ADDRESS_BASE_DEFAULT, fraction_store=FRACTION_STORE_DEFAULT):
+    # -> (ops, addresses_full) with addresses_full = hex + offset of every line
+    rng = np.random.default_rng(seed)
+    addresses = address_base + GENERATORS[pattern](num_access, rng)
+    ops = np.where(rng.random(num_access) < fraction_store, ord('S'), ord('L')).astype(np.uint8)
+    return ops, addresses
+# end
+
+
+def write_trace(path, ops, addresses, seed=0):
+    rng = np.random.default_rng(seed + 1)
+    patches = OFFSETS_PATCH[rng.integers(0, OFFSETS_PATCH.size, size=addresses.size)]
+    hexes = addresses - patches
+
+    with open(path, 'w') as file:
+        for op, patch, address_hex in zip(ops.tolist(), patches.tolist(), hexes.tolist()):
+            file.write('{} {} {:x}\n'.format(chr(op), patch, address_hex))
+        # end
+    # end
+# end
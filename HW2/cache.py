@@ -1,18 +1,23 @@
+import sys
 import math
+import heapq
 import numpy as np
 from typing import Tuple
+from collections import OrderedDict
 
 from lru_module import NwayLRU
 
 class LineDataWayCache:
 
     INDICATE_MISS = -1
+    N_WAYS_HASHED_MIN = 32  # from this associativity on, tags are found through a tag -> ways dict per line
+                            # (with a backend whose get_least is cheap, the policies are too from 32 ways on)
 
     def is_a_miss(self, indicate_target):
         return indicate_target == self.__class__.INDICATE_MISS
     # end
 
-    def __init__(self, num_line_per_way, size_data_cache_b, n_ways, bits_tag):
+    def __init__(self, num_line_per_way, size_data_cache_b, n_ways, bits_tag, klass_lru=NwayLRU):
 
         bits_np = int(math.pow(2, math.ceil(math.log(bits_tag, 2))))
         if bits_np > 64:
@@ -26,34 +31,180 @@ class LineDataWayCache:
         self.bits_tag = bits_tag
         self.str_type_np = str_type_np
 
-        self.cache = np.zeros((num_line_per_way, size_data_cache_b, n_ways), dtype=str_type_np)  # save tags
-        self.lru = NwayLRU(num_line_per_way, n_ways)
+        # a block is tagged as a whole, so one tag per way is enough; offset is only kept in the signatures
+        self.cache = np.zeros((num_line_per_way, n_ways), dtype=str_type_np)  # save tags
+        self.valid = np.zeros((num_line_per_way, n_ways), dtype=np.bool_)   # tag 0 != empty way
+        self.dirty = np.zeros((num_line_per_way, n_ways), dtype=np.bool_)   # only kept up to date by write policies
+        self.lru = klass_lru(num_line_per_way, n_ways)
+
+        # tag -> ways holding it (a list, the victim cache can hold the same tag twice), only valid ways.
+        # Hashing only pays with a backend which finds its least way without scanning the line (not ArrayLRU);
+        # the lowest empty way then comes from the ways freed (a heap) or the ways never filled (from way_fresh on)
+        self.is_hashed = n_ways >= self.__class__.N_WAYS_HASHED_MIN and getattr(self.lru, 'IS_LEAST_CHEAP', False)
+        self.ways_tag_line = [{} for _ in range(num_line_per_way)] if self.is_hashed else None
+        self.counts_valid = [0] * num_line_per_way if self.is_hashed else None
+        self.ways_freed_line = [[] for _ in range(num_line_per_way)] if self.is_hashed else None
+        self.way_fresh_line = [0] * num_line_per_way if self.is_hashed else None
+
+        self.instrument = None  # instrument.CacheInstrument, opt-in
+        self.prefetcher = None  # prefetch.Prefetcher, opt-in, filled by BatchExecutor
     # end
 
     def shape(self):
         return self.cache.shape
     # end
 
+    def memory_usage(self):
+        return {
+            'tags': self.cache.nbytes,
+            'valid': self.valid.nbytes,
+            'dirty': self.dirty.nbytes,
+            'lru': self.lru.nbytes()
+        } | ({'index': self._nbytes_index()} if self.is_hashed else {})
+    # end
+
+    def _nbytes_index(self):
+        # tag -> ways dicts with their lists and ints, the empty-way heaps and counters
+        nbytes = sum(sys.getsizeof(structure) for structure in (self.ways_tag_line, self.counts_valid, self.ways_freed_line, self.way_fresh_line))
+        for ways_tag, ways_freed in zip(self.ways_tag_line, self.ways_freed_line):
+            nbytes += sys.getsizeof(ways_tag) + sys.getsizeof(ways_freed) + sum(sys.getsizeof(way) for way in ways_freed)
+            for tag, ways in ways_tag.items():
+                nbytes += sys.getsizeof(tag) + sys.getsizeof(ways) + sum(sys.getsizeof(way) for way in ways)
+            # end
+        # end
+        return nbytes
+    # end
+
     def lookup(self, index, offset, tag):
-        data_ways_all = self.cache[index][offset]   # size->(n_ways,)
-        indicates_hit = np.where(data_ways_all == tag)[0]
-        indicate_target = self.__class__.INDICATE_MISS if indicates_hit.size == 0 else indicates_hit[0]
-        return indicate_target, self.lru.get_least(index)
+        # -> (way holding tag or INDICATE_MISS, way to fill on a miss); hashed lines skip the second on a hit (None)
+        if self.is_hashed:
+            ways = self.ways_tag_line[index].get(tag)
+            if ways:
+                return min(ways), None
+            # end
+
+            indicate_least = self.lru.get_least(index)
+            if self.counts_valid[index] < self.n_ways and self.valid[index][indicate_least]:
+                indicate_least = self._get_way_empty(index)
+            # end
+            return self.__class__.INDICATE_MISS, indicate_least
+        else:
+            data_ways_all = self.cache[index]   # size->(n_ways,)
+            indicates_hit = np.where((data_ways_all == tag) & self.valid[index])[0]
+            indicate_target = self.__class__.INDICATE_MISS if indicates_hit.size == 0 else indicates_hit[0]
+        # end
+
+        # fill empty ways first; LRU always has them as least already, other policies may not
+        indicate_least = self.lru.get_least(index)
+        valid_ways_all = self.valid[index]
+        if valid_ways_all[indicate_least] and not valid_ways_all.all():
+            indicate_least = int(valid_ways_all.argmin())
+        # end
+        return indicate_target, indicate_least
+    # end
+
+    def _get_way_empty(self, index):    # -> lowest empty way of a hashed line which is not full
+        valid_ways_all = self.valid[index]
+        ways_freed = self.ways_freed_line[index]
+        while ways_freed and valid_ways_all[ways_freed[0]]:    # filled again since freed
+            heapq.heappop(ways_freed)
+        # end
+        way_fresh = self.way_fresh_line[index]
+        while way_fresh < self.n_ways and valid_ways_all[way_fresh]:
+            way_fresh += 1
+        # end
+        self.way_fresh_line[index] = way_fresh
+        return min(ways_freed[0], way_fresh) if ways_freed else way_fresh
+    # end
+
+    def rebuild_index(self, index):
+        # for whoever writes self.cache/self.valid directly (BatchExecutor.sync)
+        if not self.is_hashed:
+            return
+        # end
+
+        ways_tag = {}
+        for way, (tag, valid) in enumerate(zip(self.cache[index].tolist(), self.valid[index].tolist())):
+            if valid:
+                ways_tag.setdefault(tag, []).append(way)
+            # end
+        # end
+        self.ways_tag_line[index] = ways_tag
+        self.counts_valid[index] = sum(len(ways) for ways in ways_tag.values())
+        self.ways_freed_line[index] = []
+        self.way_fresh_line[index] = 0
+    # end
+
+    def _index_way(self, index, tag, way):
+        self.ways_tag_line[index].setdefault(int(tag), []).append(way)
+    # end
+
+    def _unindex_way(self, index, tag, way):
+        ways_tag = self.ways_tag_line[index]
+        ways = ways_tag[int(tag)]
+        ways.remove(way)
+        if not ways:
+            del ways_tag[int(tag)]
+        # end
     # end
 
     def touch(self, index, indicate_target):    # touch no offset (LRU for line)
         self.lru.touch(index, indicate_target)
     # end
 
-    def store_direct(self, index, offset, tag, indicate_target):
-        data_ways_all = self.cache[index][offset]   # size->(n_ways,)
-        tag_removed = data_ways_all[indicate_target]
+    def store_direct(self, index, offset, tag, indicate_target):    # -> removed tag, None if the way was empty
+        data_ways_all = self.cache[index]   # size->(n_ways,)
+        valid_ways_all = self.valid[index]
+        tag_removed = data_ways_all[indicate_target] if valid_ways_all[indicate_target] else None
         data_ways_all[indicate_target] = tag
+        valid_ways_all[indicate_target] = True
+
+        if self.is_hashed and (tag_removed is None or tag_removed != tag):
+            if tag_removed is None:
+                self.counts_valid[index] += 1
+            else:
+                self._unindex_way(index, tag_removed, indicate_target)
+            # end
+            self._index_way(index, tag, indicate_target)
+        # end
 
-        LineDataWayCache.touch(self, index, indicate_target)    # self.touch might call child function
+        if tag_removed is not None and tag_removed == tag:
+            LineDataWayCache.touch(self, index, indicate_target)    # self.touch might call child function
+        else:
+            self.lru.insert(index, indicate_target)                 # a fill, policies may treat it apart from a hit
+            self.dirty[index][indicate_target] = False
+            if tag_removed is not None and self.instrument is not None:
+                self.instrument.evictions_set[index] += 1
+            # end
+        # end
         return tag_removed
     # end
 
+    def is_dirty(self, index, indicate_target):
+        return bool(self.valid[index][indicate_target] and self.dirty[index][indicate_target])
+    # end
+
+    def set_dirty(self, index, indicate_target, dirty=True):
+        self.dirty[index][indicate_target] = dirty
+    # end
+
+    def invalidate(self, index, offset, tag):    # -> True if the tag was cached
+        indicate_target, _ = LineDataWayCache.lookup(self, index, offset, tag)
+        if self.is_a_miss(indicate_target):
+            return False
+        # end
+
+        self.valid[index][indicate_target] = False
+        if self.is_hashed:
+            self._unindex_way(index, tag, indicate_target)
+            self.counts_valid[index] -= 1
+            heapq.heappush(self.ways_freed_line[index], indicate_target)
+        # end
+        self.lru.set_least(index, indicate_target)   # empty ways are always the least ones
+        return True
+    # end
+# end
+
 class VictimCache(LineDataWayCache):
 
     NUM_LINE_PER_WAY_DEFAULT = 1
@@ -63,8 +214,8 @@ class VictimCache(LineDataWayCache):
     OFFSET_VICTIM_DEFAULT = 0
 
 
-    def __init__(self, n_ways_victim, bits_tag):
-        super().__init__(VictimCache.NUM_LINE_PER_WAY_DEFAULT, VictimCache.SIZE_DATA_CACHE_B_DEFAULT, n_ways_victim, bits_tag)
+    def __init__(self, n_ways_victim, bits_tag, klass_lru=NwayLRU):
+        super().__init__(VictimCache.NUM_LINE_PER_WAY_DEFAULT, VictimCache.SIZE_DATA_CACHE_B_DEFAULT, n_ways_victim, bits_tag, klass_lru)
     # end
 
     def lookup(self, tag):
@@ -78,4 +229,114 @@ class VictimCache(LineDataWayCache):
     def touch(self, indicate_target):
         return super().touch(VictimCache.INDEX_VICTIM_DEFAULT, indicate_target)
     # end
-# end
\ No newline at end of file
+
+    def is_dirty(self, indicate_target):
+        return super().is_dirty(VictimCache.INDEX_VICTIM_DEFAULT, indicate_target)
+    # end
+
+    def set_dirty(self, indicate_target, dirty=True):
+        return super().set_dirty(VictimCache.INDEX_VICTIM_DEFAULT, indicate_target, dirty)
+    # end
+# end
+
+class FullyAssociativeCache:
+    # one line with every block of the cache and LRU replacement, for w == 0. Same calls as
+    # LineDataWayCache (index is always 0) but kept as a dict ordered from least to most recent
+    # plus the empty ways, so hits and evictions are O(1) instead of O(ways).
+
+    INDICATE_MISS = LineDataWayCache.INDICATE_MISS
+    INDEX_FULLY_DEFAULT = 0
+
+    def is_a_miss(self, indicate_target):
+        return indicate_target == self.__class__.INDICATE_MISS
+    # end
+
+    def __init__(self, n_ways, size_data_cache_b, bits_tag):
+        self.num_line_per_way = 1
+        self.size_data_cache_b = size_data_cache_b
+        self.n_ways = n_ways
+        self.bits_tag = bits_tag
+
+        self.entries = OrderedDict()                    # tag -> way, least -> most
+        self.ways_empty = list(reversed(range(n_ways)))  # pop() -> next way to fill
+        self.tags_way = [None] * n_ways                 # way -> tag, None: empty
+        self.dirty = np.zeros(n_ways, dtype=np.bool_)
+
+        self.instrument = None  # instrument.CacheInstrument, opt-in
+        self.prefetcher = None  # prefetch.Prefetcher, opt-in, filled by BatchExecutor
+    # end
+
+    def shape(self):
+        return (self.num_line_per_way, self.n_ways)
+    # end
+
+    def memory_usage(self):
+        return {
+            # getsizeof only measures a container and its slots, the int objects held are added one by one
+            'entries': sys.getsizeof(self.entries) + sum(sys.getsizeof(tag) + sys.getsizeof(way) for tag, way in self.entries.items()),
+            'empty': sys.getsizeof(self.ways_empty) + sum(sys.getsizeof(way) for way in self.ways_empty),
+            'tags': sys.getsizeof(self.tags_way),   # the same tag objects as the keys of entries
+            'dirty': self.dirty.nbytes
+        }
+    # end
+
+    def lookup(self, index, offset, tag):
+        indicate_target = self.entries.get(tag, self.__class__.INDICATE_MISS)
+        indicate_least = self.ways_empty[-1] if self.ways_empty else next(iter(self.entries.values()))
+        return indicate_target, indicate_least
+    # end
+
+    def rebuild_index(self, index):
+        # for whoever fills self.entries/self.ways_empty directly (BatchExecutor fast path)
+        self.tags_way = [None] * self.n_ways
+        for tag, way in self.entries.items():
+            self.tags_way[way] = tag
+        # end
+    # end
+
+    def touch(self, index, indicate_target):
+        self.entries.move_to_end(self.tags_way[indicate_target])
+    # end
+
+    def store_direct(self, index, offset, tag, indicate_target):    # -> removed tag, None if the way was empty
+        tag_removed = self.tags_way[indicate_target]
+        if tag_removed is not None and tag_removed == tag:
+            self.entries.move_to_end(tag)
+            return tag_removed
+        # end
+
+        if tag_removed is not None:
+            del self.entries[tag_removed]
+            if self.instrument is not None:
+                self.instrument.evictions_set[index] += 1
+            # end
+        elif self.ways_empty[-1] == indicate_target:
+            self.ways_empty.pop()
+        else:
+            self.ways_empty.remove(indicate_target)
+        # end
+        self.entries[tag] = indicate_target
+        self.tags_way[indicate_target] = tag
+        self.dirty[indicate_target] = False
+        return tag_removed
+    # end
+
+    def is_dirty(self, index, indicate_target):
+        return bool(self.tags_way[indicate_target] is not None and self.dirty[indicate_target])
+    # end
+
+    def set_dirty(self, index, indicate_target, dirty=True):
+        self.dirty[indicate_target] = dirty
+    # end
+
+    def invalidate(self, index, offset, tag):    # -> True if the tag was cached
+        indicate_target = self.entries.pop(tag, None)
+        if indicate_target is None:
+            return False
+        # end
+
+        self.tags_way[indicate_target] = None
+        self.ways_empty.append(indicate_target)     # empty ways are always the least ones
+        return True
+    # end
+# end
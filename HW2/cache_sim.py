@@ -1,8 +1,24 @@
 
 #!/usr/bin/env python3
 import argparse
+import bz2
+import gzip
+import io
+import lzma
 import math
-from typing import List, Tuple
+import mmap
+import struct
+from typing import BinaryIO, Iterator, List, Tuple
+
+# This simulator only needs the standard library, so the binary trace reader below is a small
+# copy of the format written by memtrace.py (which needs numpy) rather than an import of it:
+#   header = { magic(8B) | num_record(uint64, LE) }, record = { op(uint8) | address(uint32, LE) }
+TRACE_MAGIC = b"MTRACE01"
+TRACE_HEADER = struct.Struct("<8sQ")
+TRACE_RECORD = struct.Struct("<BI")
+COMPRESSION_MAGICS = {b"\x1f\x8b": gzip, b"\xfd7zXZ\x00": lzma, b"BZh": bz2}
+
+BINARY_CHUNK = 1 << 20
 
 def ilog2(x: int) -> int:
     if x <= 0 or (x & (x - 1)) != 0:
@@ -141,20 +157,78 @@ def parse_trace_line(line: str) -> Tuple[str, int, int]:
     address = int(addr_hex, 16) + int(offset_str, 10)
     return (op.upper(), offset, address)
 
-def run_sim(trace_path: str, cache_kb: int, block_size: int, ways: int):
+def open_trace_file(trace_path: str) -> BinaryIO:
+    """
+    Opens the trace for binary reading, decompressing gzip/xz/bz2 files on the fly.
+    """
+    with open(trace_path, "rb") as f:
+        head = f.read(max(map(len, COMPRESSION_MAGICS)))
+    for magic, module in COMPRESSION_MAGICS.items():
+        if head.startswith(magic):
+            return module.open(trace_path, "rb")
+    return open(trace_path, "rb")
+
+def is_binary_trace(trace_path: str) -> bool:
+    with open_trace_file(trace_path) as f:
+        try:
+            return f.read(len(TRACE_MAGIC)) == TRACE_MAGIC
+        except (EOFError, OSError, lzma.LZMAError) as e:
+            raise ValueError(f"{trace_path}: corrupt compressed trace: {e}")
+
+def iter_binary_addresses(f: BinaryIO, trace_path: str) -> Iterator[int]:
+    """
+    Yields the addresses of a binary trace (offset already added), f positioned at the header.
+    Plain files are memory-mapped, compressed ones read BINARY_CHUNK records at a time.
+    """
+    magic, num_record = TRACE_HEADER.unpack(f.read(TRACE_HEADER.size))
+    if magic != TRACE_MAGIC:
+        raise ValueError(f"{trace_path} is not a binary memtrace")
+    size_records = num_record * TRACE_RECORD.size
+    if num_record and isinstance(f, io.BufferedReader):
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            records = memoryview(mapped)[TRACE_HEADER.size:TRACE_HEADER.size + size_records]
+            if len(records) < size_records:
+                raise ValueError(f"{trace_path} is truncated, the header says {num_record} records")
+            try:
+                for _op, addr in TRACE_RECORD.iter_unpack(records):
+                    yield addr
+            finally:
+                records.release()
+        return
+    while size_records > 0:
+        block = f.read(min(size_records, BINARY_CHUNK * TRACE_RECORD.size))
+        if not block or len(block) % TRACE_RECORD.size:
+            raise ValueError(f"{trace_path} is truncated, the header says {num_record} records")
+        size_records -= len(block)
+        for _op, addr in TRACE_RECORD.iter_unpack(block):
+            yield addr
+
+def run_sim(trace_path: str, cache_kb: int, block_size: int, ways: int, verbose: bool = True) -> "Cache":
+    # Returns the cache with its hits/misses/accesses counters; verbose=False skips the printed summary
     cache = Cache(cache_kb, block_size, ways)
-    with open(trace_path, "r") as f:
+    if is_binary_trace(trace_path):
+        # Binary trace (see memtrace.py): addresses are already offset-patched
+        with open_trace_file(trace_path) as f:
+            for addr in iter_binary_addresses(f, trace_path):
+                cache.access(addr)
+        if verbose:
+            print(cache.summary(trace_path))
+        return cache
+    # gzip/xz/bz2 traces are decompressed on the fly
+    with io.TextIOWrapper(open_trace_file(trace_path), encoding="ascii") as f:
         for line in f:
             op, _off, addr = parse_trace_line(line)
             if not op:
                 continue
             # Treat both loads and stores as accesses
             cache.access(addr)
-    print(cache.summary(trace_path))
+    if verbose:
+        print(cache.summary(trace_path))
+    return cache
 
 def main():
     p = argparse.ArgumentParser(description="Simple Cache Simulator (LRU) per assignment spec")
-    p.add_argument("-i", "--input", required=True, help="Trace file path (memtrace)")
+    p.add_argument("-i", "--input", required=True, help="Trace file path (text memtrace or binary memtrace from memtrace.py, may be gzip/xz/bz2 compressed)")
     p.add_argument("-cs", "--cache-kb", required=True, type=int, help="Total cache size in KB (1 < cs < 4096)")
     p.add_argument("-bs", "--block-bytes", required=True, type=int, choices=[2,4,8,16,32,64], help="Cache block size in bytes")
     p.add_argument("-w", "--ways", required=True, type=int, help="Number of ways; use 0 for fully associative per assignment")
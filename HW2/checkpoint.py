@@ -0,0 +1,87 @@
+import os
+import pickle
+from dataclasses import dataclass
+from collections import defaultdict
+
+from actions import Action, ActionStats
+
+
+# a checkpoint is everything run() needs to carry on as if it never stopped: the cache and victim
+# objects (tags, valid/dirty bits, replacement state, instrument), the counters, the 3C shadow and
+# where to read the trace from. Objects are pickled as they are; NwayLRU pickles the order of
+# every line instead of its chains.
+# Unpickling runs whatever code the file asks for: only load checkpoints you wrote yourself.
+
+VERSION_CHECKPOINT = 1
+
+# a checkpoint only fits a run with the same cache and the same counters
+KEYS_CONFIG_STATE = ['cs', 'bs', 'w', 'v', 'lru', 'policy', 'engine', 'sample', 'seed', 'write_policy', 'write_allocate', 'classify',
+                     'prefetch', 'prefetch_degree']
+
+
+@dataclass
+class Checkpoint:
+    config: dict        # KEYS_CONFIG_STATE (+ instrument) of the run which took it
+    i: str
+    offset_byte: int    # next record of the trace, for memtrace.read_chunks_from
+    count_all: int      # accesses read so far, sampled sets or not
+    cache: object
+    victim: object
+    stats: ActionStats
+    classifier: object = None
+    version: int = VERSION_CHECKPOINT
+# end
+
+
+def get_config_state(config) -> dict:
+    config_state = {key: getattr(config, key) for key in KEYS_CONFIG_STATE}
+    config_state['instrument'] = bool(config.instrument)
+    return config_state
+# end
+
+
+def save_checkpoint(path, checkpoint: Checkpoint):
+    # write aside then rename, a run killed while saving keeps the previous checkpoint
+    path_tmp = '{}.tmp'.format(path)
+    with open(path_tmp, 'wb') as file:
+        pickle.dump(checkpoint, file, protocol=pickle.HIGHEST_PROTOCOL)
+    # end
+    os.replace(path_tmp, path)
+# end
+
+
+def load_checkpoint(path, config) -> Checkpoint:
+    # trusted files only, see above
+    with open(path, 'rb') as file:
+        checkpoint = pickle.load(file)
+    # end
+
+    if not isinstance(checkpoint, Checkpoint) or checkpoint.version != VERSION_CHECKPOINT:
+        raise ValueError('{} is not a version {} checkpoint'.format(path, VERSION_CHECKPOINT))
+    # end
+
+    config_state = get_config_state(config)
+    for key, value in checkpoint.config.items():
+        if config_state.get(key) != value:
+            raise ValueError('{} was taken with {}={!r}, this run has {!r}'.format(path, key, value, config_state.get(key)))
+        # end
+    # end
+    return checkpoint
+# end
+
+
+def stats_from_action() -> ActionStats:
+    # the action engine keeps its counters on the Action class
+    stats = ActionStats()
+    stats.counted_action = defaultdict(int, Action.counted_action)
+    stats.counted_miss = Action.counted_miss
+    stats.counted_victim_hit = Action.counted_victim_hit
+    return stats
+# end
+
+
+def restore_action(stats: ActionStats):
+    Action.counted_action = defaultdict(int, stats.counted_action)
+    Action.counted_miss = stats.counted_miss
+    Action.counted_victim_hit = stats.counted_victim_hit
+# end
@@ -0,0 +1,56 @@
+import numpy as np
+from dataclasses import dataclass
+
+from actions import BatchExecutor, ActionStats
+from factory import generate_components
+
+
+# 3C model (Hill), measured next to the configured cache in the same pass:
+#   compulsory = first touch of a block (misses of an infinite cache)
+#   capacity   = misses of a fully associative LRU cache of the same size - compulsory
+#   conflict   = misses of the configured cache - misses of the fully associative one
+# conflict can go below zero when the configured cache beats LRU full associativity (victim cache,
+# other replacement policies), it is the associativity the configuration saves then.
+
+
+@dataclass
+class MissClasses:
+    compulsory: int = 0
+    capacity: int = 0
+    conflict: int = 0
+# end
+
+
+class MissClassifier:
+
+    def __init__(self, cs, bs, b=32):
+        # the shadow is the dedicated fully associative engine, its tags are the block addresses
+        shadow, _, decoder = generate_components(cs, bs, 0, b=b)
+        self.decoder = decoder
+        self.executor = BatchExecutor(shadow)
+        self.blocks_seen = set()
+        self.count_seen_reset = 0   # blocks seen before reset(), not compulsory misses any more
+    # end
+
+    def feed(self, ops, addresses):
+        ops, tags, indexes, _ = self.decoder.decode_addresses(ops, addresses)
+        self.executor.execute(ops, tags, indexes)
+        self.blocks_seen.update(np.unique(tags).tolist())
+    # end
+
+    def reset(self):
+        # keep the warm shadow, count from here
+        self.executor.stats = ActionStats()
+        self.count_seen_reset = len(self.blocks_seen)
+    # end
+
+    def classify(self, count_miss) -> MissClasses:
+        count_compulsory = len(self.blocks_seen) - self.count_seen_reset
+        count_miss_fully = self.executor.stats.counted_miss
+        return MissClasses(
+            compulsory=count_compulsory,
+            capacity=count_miss_fully - count_compulsory,
+            conflict=count_miss - count_miss_fully
+        )
+    # end
+# end
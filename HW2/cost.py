@@ -0,0 +1,90 @@
+import csv
+from dataclasses import dataclass
+
+
+# every access is served by one point of the path L1 -> [victim] -> L2 -> ... -> memory and pays the
+# latency of every point it went through, so its latency only depends on where it was served:
+#   latency(point) = sum of the latencies of the points up to and including it
+# the histogram of the per-access latencies is then exact from the counts per point.
+#   AMAT = sum(count * latency) / accesses
+#   stall cycles = sum(count * (latency - latency of an L1 hit))
+
+LATENCY_HIT_DEFAULT = 1
+LATENCY_VICTIM_DEFAULT = 1
+LATENCY_MEMORY_DEFAULT = 100
+
+
+@dataclass
+class CostReport:
+    accesses: int = 0
+    cycles: int = 0
+    stall_cycles: int = 0
+    histogram: dict = None      # latency (cycles) -> number of accesses
+
+    def amat(self):
+        return self.cycles / self.accesses if self.accesses else 0.0
+    # end
+# end
+
+
+class LatencyModel:
+
+    def __init__(self, latencies_level: list[int], latency_memory=LATENCY_MEMORY_DEFAULT, latency_victim=None):
+        # latency_victim: the victim cache probed between L1 and the next level, None: no victim cache
+        if not latencies_level:
+            raise ValueError('at least one level latency is needed')
+        # end
+
+        self.latencies_level = list(latencies_level)
+        self.latency_memory = latency_memory
+        self.latency_victim = latency_victim
+    # end
+
+    def get_points(self) -> list[tuple[str, int]]:
+        # -> (name, latency of an access served there) in the order they are probed
+        names = ['L{}'.format(id_level + 1) for id_level in range(len(self.latencies_level))]
+        latencies = list(self.latencies_level)
+        if self.latency_victim is not None:
+            names.insert(1, 'victim')
+            latencies.insert(1, self.latency_victim)
+        # end
+        names.append('memory')
+        latencies.append(self.latency_memory)
+
+        points = []
+        latency_total = 0
+        for name, latency in zip(names, latencies):
+            latency_total += latency
+            points.append((name, latency_total))
+        # end
+        return points
+    # end
+
+    def evaluate(self, counts_served: dict) -> CostReport:
+        # counts_served: point name -> accesses served there, missing points served nothing
+        report = CostReport(histogram={})
+        latency_hit = self.latencies_level[0]
+        for name, latency in self.get_points():
+            count = counts_served.get(name, 0)
+            if not count:
+                continue
+            # end
+
+            report.accesses += count
+            report.cycles += count * latency
+            report.stall_cycles += count * (latency - latency_hit)
+            report.histogram[latency] = report.histogram.get(latency, 0) + count
+        # end
+        report.histogram = dict(sorted(report.histogram.items()))
+        return report
+    # end
+# end
+
+
+def write_histogram(histogram: dict, path_output):
+    with open(path_output, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['latency', 'accesses'])
+        writer.writerows(histogram.items())
+    # end
+# end
@@ -1,10 +1,15 @@
 import os
+import numpy as np
+from itertools import repeat
+from typing import Iterable, Tuple
+
 from actions import Action
 
 
 class InstructionDecoder:
 
     BITS_ADDRESS_DEFAULT = 32
+    MASK_ADDRESS_DEFAULT = (1 << BITS_ADDRESS_DEFAULT) - 1
 
     def __init__(self, bits_tag, bits_index, bits_offset):
         self.bits_tag = bits_tag
@@ -28,6 +33,57 @@ class InstructionDecoder:
             return Action.get_action_klass(action)(int_tag, int_index, 0)
     # end
 
+    @classmethod
+    def parse_batch(cls, strs_instruction: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+        # 'L -200 7fffe7ff088' * n -> ops(uint8, ord of action), addresses(uint32, already patched)
+        tokens = ' '.join(strs_instruction).split()
+        if len(tokens) % 3:
+            raise ValueError('trace chunk is not made of <action> <offset> <hex> triples')
+        # end
+
+        num_instruction = len(tokens) // 3
+        ops = np.frombuffer(''.join(tokens[0::3]).encode('ascii'), dtype=np.uint8)
+        if ops.size != num_instruction:
+            raise ValueError('trace chunk has an action which is not a single character')
+        # end
+
+        addresses_patch = np.array(tokens[1::3], dtype=np.int64)
+        addresses_hex = np.fromiter(map(int, tokens[2::3], repeat(16)), dtype=np.int64, count=num_instruction)
+        addresses = ((addresses_hex + addresses_patch) & cls.MASK_ADDRESS_DEFAULT).astype(np.uint32)
+
+        return ops, addresses
+    # end
+
+    def decode_addresses(self, ops, addresses) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # address = { tag | index | offset }, all done with shifts and masks
+        addresses = np.asarray(addresses, dtype=np.uint32)
+        mask_index = np.uint32((1 << self.bits_index) - 1)
+        mask_offset = np.uint32((1 << self.bits_offset) - 1)
+
+        tags = addresses >> np.uint32(self.bits_index + self.bits_offset)
+        indexes = (addresses >> np.uint32(self.bits_offset)) & mask_index
+
+        if os.getenv('ENABLE_INDEX'):
+            offsets = addresses & mask_offset
+        else:
+            offsets = np.zeros_like(addresses)
+        # end
+
+        return ops, tags, indexes, offsets
+    # end
+
+    def decode_batch(self, strs_instruction: Iterable[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        ops, addresses = self.__class__.parse_batch(strs_instruction)
+        return self.decode_addresses(ops, addresses)
+    # end
+
+    def generate_actions(self, ops, tags, indexes, offsets):
+        klasses_action = {op: Action.get_action_klass(chr(op)) for op in np.unique(ops).tolist()}
+        for op, tag, index, offset in zip(ops.tolist(), tags.tolist(), indexes.tolist(), offsets.tolist()):
+            yield klasses_action[op](tag, index, offset)
+        # end
+    # end
+
     def _patch_binary_str(self, input, bits_target):
         if len(input) > bits_target:
             return input[-bits_target:]
@@ -35,4 +91,4 @@ class InstructionDecoder:
         input = '0'*(bits_target - len(input)) + input
         return input
     # end
-# end
\ No newline at end of file
+# end
@@ -5,13 +5,17 @@ from typing import Tuple
 from tqdm import tqdm
 from collections import defaultdict
 
-from cache import LineDataWayCache, VictimCache
+from cache import LineDataWayCache, VictimCache, FullyAssociativeCache
 from decoder import InstructionDecoder
 from actions import Action
+from lru_module import NwayLRU, ArrayLRU
+from policy_module import ReplacementPolicy
+from functools import partial
 import json
 
 
-def generate_components(cs, bs, w, v=0, b = 32) -> Tuple[LineDataWayCache, VictimCache, InstructionDecoder]:
+def generate_components(cs, bs, w, v=0, b = 32, lru='chain', policy='lru', seed=0, num_part=1) -> Tuple[LineDataWayCache, VictimCache, InstructionDecoder]:
+    # num_part > 1: the cache only holds the sets of one partition (index % num_part), fed with index // num_part
 
     # rename all parameters using me-style
     size_cache_total_kb = cs
@@ -25,7 +29,8 @@ def generate_components(cs, bs, w, v=0, b = 32) -> Tuple[LineDataWayCache, Victi
     size_cache_total_b = 1024 * size_cache_total_kb
     num_lines_total = int(size_cache_total_b / size_data_cache_b)
 
-    if n_ways == 0:
+    is_fully_associative = n_ways == 0
+    if is_fully_associative:
         num_line_per_way = 1
         n_ways = num_lines_total
     else:
@@ -37,8 +42,25 @@ def generate_components(cs, bs, w, v=0, b = 32) -> Tuple[LineDataWayCache, Victi
     bits_offset = int(math.log(size_data_cache_b, 2))
     bits_tag = bits_address - bits_index - bits_offset
 
-    cache = LineDataWayCache(num_line_per_way, size_data_cache_b, n_ways, bits_tag)
-    victim = VictimCache(n_ways_victim, bits_tag) if n_ways_victim > 0 else None
+    klass_lru = None
+    match (policy, lru):
+        case ('lru', 'chain'):
+            klass_lru = NwayLRU     # linked list per line
+        case ('lru', 'array'):
+            klass_lru = ArrayLRU    # one stamp matrix for all lines
+        case ('lru', _):
+            raise ValueError('unknown lru backend: {}'.format(lru))
+        case _:
+            klass_lru = partial(ReplacementPolicy.get_policy_klass(policy), seed=seed)
+        # end case
+    # end match
+
+    if is_fully_associative and policy == 'lru':    # dedicated engine, whatever the lru backend
+        cache = FullyAssociativeCache(n_ways, size_data_cache_b, bits_tag)
+    else:
+        cache = LineDataWayCache(-(-num_line_per_way // num_part), size_data_cache_b, n_ways, bits_tag, klass_lru)
+    # end
+    victim = VictimCache(n_ways_victim, bits_tag, klass_lru) if n_ways_victim > 0 else None
     decoder = InstructionDecoder(bits_tag, bits_index, bits_offset)
 
     return cache, victim, decoder
@@ -0,0 +1,294 @@
+import sys
+import argparse
+from dataclasses import dataclass
+
+from factory import generate_components
+from memtrace import read_chunks
+from cost import LatencyModel, write_histogram
+from main import Config
+
+
+# L1 -> L2 -> ... -> memory in one pass over the trace, every level is a LineDataWayCache.
+# The policy of a level says how it relates to the levels above it:
+#   inclusive: filled on every miss that reaches it, evicting a block back-invalidates it above
+#   exclusive: only filled with the blocks evicted by the level above, a hit moves the block up
+#   nine:      filled on every miss that reaches it, evictions are never propagated (non-inclusive non-exclusive)
+
+POLICY_VALID = ['inclusive', 'exclusive', 'nine']
+
+
+@dataclass
+class LevelStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0  # blocks removed by back-invalidation from a lower inclusive level
+
+    def accesses(self):
+        return self.hits + self.misses
+    # end
+
+    def miss_rate(self):
+        return self.misses / self.accesses() if self.accesses() else 0.0
+    # end
+# end
+
+
+class CacheLevel:
+
+    def __init__(self, name, cs, bs, w, policy='nine', lru='array'):
+        if policy not in POLICY_VALID:
+            raise ValueError('unknown policy: {}'.format(policy))
+        # end
+
+        self.name = name
+        self.cs = cs
+        self.bs = bs
+        self.w = w
+        self.policy = policy
+
+        self.cache, _, decoder = generate_components(cs, bs, w, lru=lru)
+        self.bits_offset = decoder.bits_offset
+        self.bits_index = decoder.bits_index
+        self.mask_index = (1 << decoder.bits_index) - 1
+        self.stats = LevelStats()
+    # end
+
+    def split(self, address):
+        return address >> (self.bits_index + self.bits_offset), (address >> self.bits_offset) & self.mask_index
+    # end
+
+    def join(self, tag, index):
+        return (tag << (self.bits_index + self.bits_offset)) | (index << self.bits_offset)
+    # end
+
+    def probe(self, address):   # -> way, MISS if absent
+        tag, index = self.split(address)
+        indicate_target, _ = self.cache.lookup(index, 0, tag)
+        return indicate_target
+    # end
+
+    def is_a_miss(self, indicate_target):
+        return self.cache.is_a_miss(indicate_target)
+    # end
+
+    def touch(self, address, indicate_target):
+        _, index = self.split(address)
+        self.cache.touch(index, indicate_target)
+    # end
+
+    def fill(self, address):    # -> address of the evicted block, None if an empty way was used
+        tag, index = self.split(address)
+        indicate_target, indicate_least = self.cache.lookup(index, 0, tag)
+        if not self.cache.is_a_miss(indicate_target):   # already there, nothing to bring in
+            self.cache.touch(index, indicate_target)
+            return None
+        # end
+        tag_removed = self.cache.store_direct(index, 0, tag, indicate_least)
+        if tag_removed is None:
+            return None
+        # end
+
+        self.stats.evictions += 1
+        return self.join(int(tag_removed), index)
+    # end
+
+    def invalidate(self, address):
+        tag, index = self.split(address)
+        return self.cache.invalidate(index, 0, tag)
+    # end
+# end
+
+
+class CacheHierarchy:
+
+    def __init__(self, levels: list[CacheLevel]):
+        for upper, lower in zip(levels, levels[1:]):
+            if lower.bs < upper.bs:
+                raise ValueError('{}: block size must not shrink going down ({} B < {} B)'.format(lower.name, lower.bs, upper.bs))
+            # end
+            if lower.policy == 'exclusive' and lower.bs != upper.bs:
+                raise ValueError('{}: exclusive level needs the block size of the level above'.format(lower.name))
+            # end
+        # end
+
+        self.levels = levels
+        self.count_access = 0
+    # end
+
+    def access(self, address):
+        levels = self.levels
+        self.count_access += 1
+
+        # find the first level holding the block, every level on the way misses
+        level_hit = len(levels)
+        for id_level, level in enumerate(levels):
+            indicate_target = level.probe(address)
+            if level.is_a_miss(indicate_target):
+                level.stats.misses += 1
+                continue
+            # end
+
+            level.stats.hits += 1
+            if id_level > 0 and level.policy == 'exclusive':
+                level.invalidate(address)       # the block moves up
+            else:
+                level.touch(address, indicate_target)
+            # end
+            level_hit = id_level
+            break
+        # end
+
+        # bring the block into the levels above the hit (or all of them after a memory access), bottom up
+        for id_level in reversed(range(level_hit)):
+            if id_level > 0 and levels[id_level].policy == 'exclusive':
+                continue
+            # end
+            self._fill(id_level, address)
+        # end
+    # end
+
+    def _fill(self, id_level, address):
+        levels = self.levels
+        address_removed = levels[id_level].fill(address)
+        if address_removed is None:
+            return
+        # end
+
+        level = levels[id_level]
+        if id_level > 0 and level.policy == 'inclusive':
+            self._back_invalidate(id_level, address_removed)
+        # end
+
+        if id_level + 1 < len(levels) and levels[id_level + 1].policy == 'exclusive':
+            self._fill(id_level + 1, address_removed)    # victim of the level above
+        # end
+    # end
+
+    def _back_invalidate(self, id_level, address_removed):
+        bs_lower = self.levels[id_level].bs
+        for level in self.levels[:id_level]:
+            for address in range(address_removed, address_removed + bs_lower, level.bs):
+                if level.invalidate(address):
+                    level.stats.invalidations += 1
+                # end
+            # end
+        # end
+    # end
+
+    def feed(self, addresses):
+        access = self.access
+        for address in addresses.tolist():
+            access(address)
+        # end
+    # end
+# end
+
+
+def parse_level(str_level, id_level):
+    # 'cs:bs:w[:policy]' -> CacheLevel
+    parts = str_level.split(':')
+    if len(parts) not in (3, 4):
+        raise ValueError('level must be cs:bs:w[:policy], got {}'.format(str_level))
+    # end
+    try:
+        cs, bs, w = (int(part) for part in parts[:3])
+    except ValueError:
+        raise ValueError('level must be cs:bs:w[:policy] with integer cs/bs/w, got {}'.format(str_level))
+    # end
+    # the choices of main.py, generate_components would round anything else down to another cache
+    if cs not in Config.CS_RANGE_VALID or bs not in Config.BS_VALID or w not in Config.WAYS_VALID:
+        raise ValueError('level {} must have cs in [1-4096], bs in {} and w in {}'.format(str_level, Config.BS_VALID, Config.WAYS_VALID))
+    # end
+    if w > 1024 * cs // bs:
+        raise ValueError('level {} has more ways than its {} lines'.format(str_level, 1024 * cs // bs))
+    # end
+    policy = parts[3] if len(parts) == 4 else 'nine'
+    return CacheLevel('L{}'.format(id_level + 1), cs, bs, w, policy)
+# end
+
+
+def generate_parser():
+    parser = argparse.ArgumentParser(
+        prog='hierarchy.py',
+        description='Multi-level cache hierarchy simulated in a single pass',
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+
+    parser.add_argument('-i', required=True, type=str, help='Input file (text memtrace or binary memtrace from memtrace.py)')
+    parser.add_argument('-L', required=True, type=str, action='append', metavar='cs:bs:w[:policy]',
+                        help='One level, repeat from L1 down, policy {} (default nine, ignored for L1)'.format(POLICY_VALID))
+
+    parser.add_argument('-lat', type=str, metavar='l1,l2,...', help='(Optional) Hit latency (cycles) of every level, reports the AMAT, needs -lat-mem')
+    parser.add_argument('-lat-mem', type=int, default=0, help='(Optional) Memory latency (cycles)')
+    parser.add_argument('--lat-hist', type=str, default='', help='(Optional) Write the per-access latency histogram as csv, needs -lat')
+
+    return parser
+# end
+
+
+def main(argv):
+    parser = generate_parser()
+    args = parser.parse_known_args(argv)[0]
+
+    try:
+        hierarchy = CacheHierarchy([parse_level(str_level, id_level) for id_level, str_level in enumerate(args.L)])
+    except ValueError as e:
+        parser.error(str(e))
+    # end
+
+    model = None
+    if args.lat:
+        try:
+            latencies_level = [int(str_latency) for str_latency in args.lat.split(',')]
+        except ValueError:
+            parser.error('-lat must be a comma separated list of cycles, got {}'.format(args.lat))
+        # end
+        if len(latencies_level) != len(hierarchy.levels):
+            parser.error('-lat needs one latency per level ({}), got {}'.format(len(hierarchy.levels), len(latencies_level)))
+        # end
+        if not args.lat_mem:
+            parser.error('-lat needs -lat-mem')
+        # end
+        model = LatencyModel(latencies_level, args.lat_mem)
+    elif args.lat_hist:
+        parser.error('--lat-hist needs -lat')
+    # end
+
+    for _, addresses in read_chunks(args.i):
+        hierarchy.feed(addresses)
+    # end
+
+    print('**********************')
+    print('file name: {}'.format(args.i))
+    print('Instruction count = {}'.format(hierarchy.count_access))
+    for level in hierarchy.levels:
+        stats = level.stats
+        print()
+        print('{}: Cache Size = {} KB, Block Size = {} B, ways = {}, policy = {}'.format(level.name, level.cs, level.bs, level.w, level.policy))
+        print('{} hit count = {}'.format(level.name, stats.hits))
+        print('{} miss count = {}'.format(level.name, stats.misses))
+        print('{} eviction count = {}'.format(level.name, stats.evictions))
+        print('{} back-invalidation count = {}'.format(level.name, stats.invalidations))
+        print('{} local miss rate = {:0.2f}%'.format(level.name, stats.miss_rate()*100))
+    # end
+    print()
+    count_memory = hierarchy.levels[-1].stats.misses
+    print('Memory access count = {}'.format(count_memory))
+    print('Global miss rate = {:0.2f}%'.format(count_memory / hierarchy.count_access * 100 if hierarchy.count_access else 0.0))
+    if model is not None:
+        counts_served = {level.name: level.stats.hits for level in hierarchy.levels}
+        counts_served['memory'] = count_memory
+        report = model.evaluate(counts_served)
+        print('Average memory access time = {:0.2f} cycles'.format(report.amat()))
+        print('Stall cycles = {}'.format(report.stall_cycles))
+        if args.lat_hist:
+            write_histogram(report.histogram, args.lat_hist)
+        # end
+    # end
+    print('**********************')
+# end
+
+if __name__ == "__main__":
+    main(sys.argv)
+# end
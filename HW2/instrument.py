@@ -0,0 +1,83 @@
+import numpy as np
+
+from actions import ActionStats
+
+
+# opt-in per-set and reuse instrumentation of one cache, attached as cache.instrument:
+#   - accesses/misses per set come from the executor's per-set ActionStats counts
+#   - evictions per set are counted by the cache (store_direct) or the executor fast path
+#   - reuse time = accesses between two touches of the same block (0: back to back), in log2
+#     buckets: bucket 0 holds time 0, bucket k holds [2^(k-1), 2^k); first touches are counted apart.
+#     Repeated accesses count each time, so it is not the reuse (stack) distance of stack_distance.py
+# nothing is recorded (and nothing checked on a hit) while cache.instrument is None.
+
+NUM_BUCKET_REUSE = 64
+
+
+class CacheInstrument:
+
+    def __init__(self, num_set, bits_index):
+        self.bits_index = bits_index
+        self.evictions_set = [0] * num_set
+
+        self.histogram_reuse_time = np.zeros(NUM_BUCKET_REUSE, dtype=np.int64)
+        self.count_first_touch = 0
+        self.position = 0
+        self.position_last = {}     # block -> position of its latest access
+    # end
+
+    def record_accesses(self, tags, indexes):
+        blocks = (np.asarray(tags, dtype=np.uint64) << np.uint64(self.bits_index)) | np.asarray(indexes, dtype=np.uint64)
+        positions = np.arange(self.position, self.position + blocks.size, dtype=np.int64)
+        self.position += blocks.size
+
+        # previous access of every access: inside the chunk from a stable sort, else from position_last
+        order = np.argsort(blocks, kind='stable')
+        blocks_sorted = blocks[order]
+        positions_sorted = positions[order]
+        is_repeat = np.zeros(blocks.size, dtype=np.bool_)
+        is_repeat[1:] = blocks_sorted[1:] == blocks_sorted[:-1]
+
+        positions_previous = np.full(blocks.size, -1, dtype=np.int64)
+        positions_previous[1:][is_repeat[1:]] = positions_sorted[:-1][is_repeat[1:]]
+
+        position_last = self.position_last
+        firsts = np.flatnonzero(~is_repeat)
+        for id_sorted, block in zip(firsts.tolist(), blocks_sorted[firsts].tolist()):
+            positions_previous[id_sorted] = position_last.get(block, -1)
+        # end
+
+        lasts = np.append(firsts[1:] - 1, blocks.size - 1) if blocks.size else firsts
+        position_last.update(zip(blocks_sorted[lasts].tolist(), positions_sorted[lasts].tolist()))
+
+        is_reuse = positions_previous >= 0
+        self.count_first_touch += int(blocks.size - is_reuse.sum())
+        times = positions_sorted[is_reuse] - positions_previous[is_reuse] - 1
+
+        buckets = np.zeros(times.size, dtype=np.int64)
+        is_far = times > 0
+        buckets[is_far] = np.floor(np.log2(times[is_far])).astype(np.int64) + 1
+        self.histogram_reuse_time += np.bincount(buckets, minlength=NUM_BUCKET_REUSE)[:NUM_BUCKET_REUSE]
+    # end
+
+    def reset(self):
+        # keep the reuse history, count from here
+        self.evictions_set = [0] * len(self.evictions_set)
+        self.histogram_reuse_time[:] = 0
+        self.count_first_touch = 0
+    # end
+
+    def save(self, path, stats: ActionStats):
+        accesses_set = np.asarray(stats.counted_access_set, dtype=np.int64)
+        misses_set = np.asarray(stats.counted_miss_set, dtype=np.int64)
+        np.savez(
+            path,
+            accesses_set=accesses_set,
+            hits_set=accesses_set - misses_set,
+            misses_set=misses_set,
+            evictions_set=np.asarray(self.evictions_set, dtype=np.int64),
+            reuse_time_histogram=self.histogram_reuse_time,
+            reuse_first_touch=np.int64(self.count_first_touch)
+        )
+    # end
+# end
@@ -1,3 +1,5 @@
+import sys
+import numpy as np
 from typing import Self, Tuple
 
 
@@ -129,23 +131,23 @@ class LRULine():
         head.set_previous(current)
     # end
 
-    # def _set_least(self, id_target):
-    #     current = self.index_line[id_target]
+    def _set_least(self, id_target):
+        current = self.index_line[id_target]
 
-    #     # take from original location
-    #     current.get_previous().set_next(current.get_next())
-    #     current.get_next().set_previous(current.get_previous())
+        # take from original location
+        current.get_previous().set_next(current.get_next())
+        current.get_next().set_previous(current.get_previous())
 
-    #     # set to target location(behind the most/head)
-    #     tail = self.tail
-    #     next = tail.get_next()
+        # set to target location(in front of the least/tail)
+        tail = self.tail
+        next = tail.get_next()
 
-    #     tail.set_next(current)
-    #     current.set_previous(tail)
+        tail.set_next(current)
+        current.set_previous(tail)
 
-    #     current.set_next(next)
-    #     next.set_previous(current)
-    # # end
+        current.set_next(next)
+        next.set_previous(current)
+    # end
 
     def get_id_most(self):
         return self.head.get_previous().get_id()
@@ -158,6 +160,10 @@ class LRULine():
     def set_id_to_most(self, id_target):
         self._set_most(id_target)
     # end
+
+    def set_id_to_least(self, id_target):
+        self._set_least(id_target)
+    # end
 # end
 
 class LRULine_One(LRULine):
@@ -196,11 +202,18 @@ class LRULine_One(LRULine):
     def set_id_to_most(self, id_target):
         pass
     # end
+
+    def set_id_to_least(self, id_target):
+        pass
+    # end
 # end
 
 
 
 class NwayLRU():
+
+    IS_LEAST_CHEAP = True   # get_least is the tail of a linked list
+
     def __init__(self, n_lines, n_ways):
 
         # handle 0 way situation to make fully associate cache with l_lines way
@@ -231,12 +244,109 @@ class NwayLRU():
         self.index_lines[id_line].set_id_to_most(id_way)
     # end
 
+    def insert(self, id_line, id_way):   # a fill is just a touch for LRU
+        self.touch(id_line, id_way)
+    # end
+
+    def set_least(self, id_line, id_way):
+        self.index_lines[id_line].set_id_to_least(id_way)
+    # end
+
     def get_least(self, id_line):
         return self.index_lines[id_line].get_id_least()
     # end
 
+    def get_order(self, id_line):    # -> ways from least to most
+        return self.index_lines[id_line].inspect()[1:-1]
+    # end
+
+    def set_order(self, id_line, ids_way):
+        for id_way in ids_way:
+            self.touch(id_line, id_way)
+        # end
+    # end
+
     def shape(self):
         return (len(self.index_lines), len(self.index_lines[0])-2)
     # end
 
-# end
\ No newline at end of file
+    def __getstate__(self):
+        # the chains are too deep for pickle, keep the order of every line and rebuild them
+        n_lines, n_ways = self.shape()
+        return {'n_ways': n_ways, 'orders': [self.get_order(id_line) for id_line in range(n_lines)]}
+    # end
+
+    def __setstate__(self, state):
+        self.__init__(len(state['orders']), state['n_ways'])
+        for id_line, ids_way in enumerate(state['orders']):
+            self.set_order(id_line, ids_way)
+        # end
+    # end
+
+    def nbytes(self):
+        # every line is built the same way, so measure the first one and scale
+        line = self.index_lines[0]
+        size_line = sys.getsizeof(line) + sys.getsizeof(line.__dict__) + sys.getsizeof(line.index_line)
+        size_line += sum(sys.getsizeof(unit) + sys.getsizeof(unit.__dict__) for unit in line.get_tail())
+        return sys.getsizeof(self.index_lines) + size_line * len(self.index_lines)
+    # end
+
+# end
+
+
+class ArrayLRU():
+    # same touch/get_least interface as NwayLRU, but the recency of every line lives in one
+    # (n_lines, n_ways) matrix of last-touch stamps instead of n_lines linked lists: least = smallest stamp
+
+    IS_LEAST_CHEAP = False  # get_least scans the stamps of the line
+
+    def __init__(self, n_lines, n_ways):
+
+        # handle 0 way situation to make fully associate cache with l_lines way
+        if n_ways == 0:
+            n_ways = n_lines
+            n_lines = 1
+        # end
+
+        # untouched ways are ordered 0..n_ways-1 from least to most, same as ChainLine.generate_line
+        stamps = np.empty((n_lines, n_ways), dtype=np.int64)
+        stamps[:] = np.arange(n_ways, dtype=np.int64) - n_ways
+
+        self.stamps = stamps
+        self.stamp_next = 0
+    # end
+
+    def touch(self, id_line, id_way):
+        self.stamps[id_line, id_way] = self.stamp_next
+        self.stamp_next += 1
+    # end
+
+    def insert(self, id_line, id_way):   # a fill is just a touch for LRU
+        self.touch(id_line, id_way)
+    # end
+
+    def set_least(self, id_line, id_way):
+        self.stamps[id_line, id_way] = self.stamps[id_line].min() - 1
+    # end
+
+    def get_least(self, id_line):
+        return int(self.stamps[id_line].argmin())
+    # end
+
+    def get_order(self, id_line):    # -> ways from least to most
+        return self.stamps[id_line].argsort(kind='stable').tolist()
+    # end
+
+    def set_order(self, id_line, ids_way):
+        self.stamps[id_line, ids_way] = np.arange(self.stamp_next, self.stamp_next + len(ids_way))
+        self.stamp_next += len(ids_way)
+    # end
+
+    def shape(self):
+        return self.stamps.shape
+    # end
+
+    def nbytes(self):
+        return self.stamps.nbytes
+    # end
+# end
@@ -1,10 +1,21 @@
 import os
 import sys
+import time
 import argparse
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
+from tqdm import tqdm
 
-from actions import Action
+from actions import Action, ActionStats, BatchExecutor
 from factory import generate_components
+from memtrace import read_chunks, read_chunks_from, count_records
+from sampling import choose_sets, estimate_miss_rate
+from policy_module import ReplacementPolicy
+from classify import MissClassifier
+from instrument import CacheInstrument
+from checkpoint import Checkpoint, get_config_state, save_checkpoint, load_checkpoint, stats_from_action, restore_action
+from prefetch import Prefetcher, PrefetchStats
+from parallel import run_partitioned, POLICY_SHARED_RNG
+from cost import LatencyModel, write_histogram, LATENCY_HIT_DEFAULT, LATENCY_VICTIM_DEFAULT
 
 @dataclass
 class Config:
@@ -12,12 +23,38 @@ class Config:
     WAYS_VALID = [0,1,2,4,8,16]
     CS_RANGE_VALID = range(1,4096+1)
     VICTIM_RANGE_VALID = range(1, 1024+1)
+    LRU_VALID = ['chain', 'array']
+    ENGINE_VALID = ['batch', 'action']
+    POLICY_VALID = ['lru', *ReplacementPolicy.list_policies()]
 
     i: str
     cs: int
     bs: int
     w: int
     v: int = 0
+    lru: str = 'chain'
+    policy: str = 'lru'
+    engine: str = 'batch'
+    mem_report: bool = False
+    progress: bool = False
+    sample: float = 1.0     # fraction of sets simulated, 1.0: exact
+    seed: int = 0
+    write_policy: str = ''  # '': stores are plain accesses, 'wb': write-back, 'wt': write-through
+    write_allocate: bool = True
+    lat_hit: int = LATENCY_HIT_DEFAULT
+    lat_victim: int = LATENCY_VICTIM_DEFAULT
+    lat_mem: int = 0        # memory latency in cycles, 0: no cost model
+    lat_hist: str = ''      # csv of the per-access latency histogram, needs lat_mem
+    classify: bool = False  # split the misses into compulsory/capacity/conflict
+    instrument: str = ''    # .npz of the per-set counts and the reuse time histogram, '': not instrumented
+    checkpoint: str = ''    # where to save the simulator state, at the end and every checkpoint_every accesses
+    checkpoint_every: int = 0
+    stop_at: int = 0        # stop after this many accesses (counting the resumed ones), 0: end of the trace
+    resume: str = ''        # checkpoint to start from
+    reset_stats: bool = False   # with resume: warm cache, counters from zero
+    jobs: int = 1           # > 1: sets split across that many processes
+    prefetch: str = ''      # prefetcher filling the cache, '': none
+    prefetch_degree: int = 0    # blocks asked per trigger, 0: the prefetcher's default
 # end
 
 def generate_parser():
@@ -27,15 +64,93 @@ def generate_parser():
         formatter_class=argparse.RawTextHelpFormatter
     )
 
-    parser.add_argument('-i', required=True, type=str, help='Input file')
+    parser.add_argument('-i', required=True, type=str, help='Input file (text memtrace or binary memtrace from memtrace.py, may be gzip/xz/bz2 compressed)')
     parser.add_argument('-cs', required=True, type=int, choices=Config.CS_RANGE_VALID, metavar='[1-4096]', help='Total Cache Size(KB)')
     parser.add_argument('-bs', required=True, type=int, choices=Config.BS_VALID, help='Cache Block Size(B), {}'.format(Config.BS_VALID))
     parser.add_argument('-w', required=True, type=int, choices=Config.WAYS_VALID, help='Number of Ways {}, 0: fully associate, 1: direct mapping'.format(Config.WAYS_VALID))
     parser.add_argument('-v', type=int, choices=Config.VICTIM_RANGE_VALID, metavar='[1-1024]',help='(Optional) Victim Cache Size(lines)')
+    parser.add_argument('-C', dest='caches', type=str, action='append', default=[], metavar='CS:BS:W[:V]', help='(Optional) Another cache simulated in the same pass over -i, other options shared; repeatable')
+    parser.add_argument('-lru', type=str, choices=Config.LRU_VALID, default='chain', help='(Optional) LRU backend {}, chain: linked list per line, array: stamp matrix'.format(Config.LRU_VALID))
+    parser.add_argument('-rp', type=str, choices=Config.POLICY_VALID, default='lru', help='(Optional) Replacement policy {}, -lru picks the backend of lru'.format(Config.POLICY_VALID))
+    parser.add_argument('-wp', type=str, choices=BatchExecutor.WRITE_POLICY_VALID, help='(Optional) Model writes, wb: write-back (dirty bits), wt: write-through, reports the memory traffic')
+    parser.add_argument('-nwa', action='store_true', help='(Optional) No-write-allocate: store misses write around the cache, needs -wp')
+    parser.add_argument('-lat-hit', type=int, default=LATENCY_HIT_DEFAULT, help='(Optional) Cache hit latency (cycles), default {}'.format(LATENCY_HIT_DEFAULT))
+    parser.add_argument('-lat-victim', type=int, default=LATENCY_VICTIM_DEFAULT, help='(Optional) Victim cache latency (cycles) paid after a cache miss, default {}'.format(LATENCY_VICTIM_DEFAULT))
+    parser.add_argument('-lat-mem', type=int, default=0, help='(Optional) Memory latency (cycles), reports the AMAT and the stall cycles')
+    parser.add_argument('--lat-hist', type=str, default='', help='(Optional) Write the per-access latency histogram as csv, needs -lat-mem')
+    parser.add_argument('-3c', dest='classify', action='store_true', help='(Optional) Split the misses into compulsory/capacity/conflict with a fully-associative shadow cache')
+    parser.add_argument('--instrument', type=str, default='', metavar='PATH.npz', help='(Optional) Save per-set accesses/hits/misses/evictions and the reuse time histogram (accesses between two touches of a block)')
+    parser.add_argument('--checkpoint', type=str, default='', metavar='PATH', help='(Optional) Save the simulator state here at the end of the run (or --stop-at)')
+    parser.add_argument('--checkpoint-every', type=int, default=0, metavar='N', help='(Optional) Also save it every N accesses, needs --checkpoint')
+    parser.add_argument('--stop-at', type=int, default=0, metavar='N', help='(Optional) Stop after N accesses, resumed ones included')
+    parser.add_argument('--resume', type=str, default='', metavar='PATH', help='(Optional) Start from a checkpoint of the same configuration, from the start of -i if it is another trace. WARNING: checkpoints are pickles, loading one can run arbitrary code, only resume from files you trust')
+    parser.add_argument('--reset-stats', action='store_true', help='(Optional) With --resume: keep the warm cache, count from zero')
+    parser.add_argument('--jobs', type=int, default=1, metavar='N', help='(Optional) Split the sets across N processes, exact; needs -w > 0, no -v and a policy without a shared rng.\nA text or compressed -i is parsed by this process and fed to the others, which caps the speed-up;\nconvert it once with memtrace.py so every process maps the binary trace')
+    parser.add_argument('-pf', type=str, choices=Prefetcher.list_prefetchers(), help='(Optional) Hardware prefetcher {}, reports accuracy/coverage/pollution'.format(Prefetcher.list_prefetchers()))
+    parser.add_argument('-pf-degree', type=int, default=0, help='(Optional) Blocks prefetched per trigger, default: per prefetcher')
+    parser.add_argument('-engine', type=str, choices=Config.ENGINE_VALID, default='batch', help='(Optional) Simulation engine {}, batch: array kernel, action: one Action per access'.format(Config.ENGINE_VALID))
+    parser.add_argument('--mem-report', action='store_true', help='(Optional) Print the bytes used by each cache structure')
+    parser.add_argument('--progress', action='store_true', help='(Optional) Show a progress bar and the accesses/sec on stderr')
+    parser.add_argument('-sample', type=float, default=1.0, metavar='(0-1]', help='(Optional) Fraction of sets to simulate, the miss rate comes with a 95%% confidence interval (not with -wp)')
+    parser.add_argument('-seed', type=int, default=0, help='(Optional) Seed used to pick the sampled sets and by the random/brrip policies')
 
     return parser
 # end
 
+def check_config(parser, config: Config):
+    if not 0 < config.sample <= 1:
+        parser.error('-sample must be in (0, 1]')
+    # end
+    if config.sample < 1 and (config.w == 0 or config.v or config.engine != 'batch'):
+        parser.error('-sample needs independent sets: -w > 0, no -v and -engine batch')
+    # end
+    if config.sample < 1 and config.write_policy:    # bytes and writebacks would only cover the sampled sets
+        parser.error('-sample does not go with -wp')
+    # end
+    if not config.write_allocate and not config.write_policy:
+        parser.error('-nwa needs -wp')
+    # end
+    if config.write_policy and config.engine != 'batch':
+        parser.error('-wp needs -engine batch')
+    # end
+    if config.instrument and config.engine != 'batch':
+        parser.error('--instrument needs -engine batch')
+    # end
+    if config.checkpoint_every and not config.checkpoint:
+        parser.error('--checkpoint-every needs --checkpoint')
+    # end
+    if min(config.checkpoint_every, config.stop_at) < 0:
+        parser.error('--checkpoint-every and --stop-at must not be negative')
+    # end
+    if config.reset_stats and not config.resume:
+        parser.error('--reset-stats needs --resume')
+    # end
+    if config.jobs < 1:
+        parser.error('--jobs must be at least 1')
+    # end
+    if config.jobs > 1 and (config.w == 0 or config.v or config.engine != 'batch' or config.policy in POLICY_SHARED_RNG):
+        parser.error('--jobs needs independent sets: -w > 0, no -v, -engine batch and -rp not in {}'.format(POLICY_SHARED_RNG))
+    # end
+    if config.jobs > 1 and (config.sample < 1 or config.classify or config.instrument or config.checkpoint or config.resume or config.stop_at or config.mem_report):
+        parser.error('--jobs does not go with -sample, -3c, --instrument, --checkpoint, --resume, --stop-at or --mem-report')
+    # end
+    if config.prefetch and (config.w == 0 or config.v or config.engine != 'batch' or config.sample < 1 or config.jobs > 1 or config.classify):
+        parser.error('-pf needs -w > 0 and -engine batch, and does not go with -v, -sample, --jobs or -3c')
+    # end
+    if config.prefetch_degree < 0 or (config.prefetch_degree and not config.prefetch):
+        parser.error('-pf-degree needs -pf and must not be negative')
+    # end
+    if min(config.lat_hit, config.lat_victim, config.lat_mem) < 0:
+        parser.error('latencies must not be negative')
+    # end
+    if config.lat_hist and not config.lat_mem:
+        parser.error('--lat-hist needs -lat-mem')
+    # end
+    if config.classify and (config.sample < 1 or not config.write_allocate):
+        parser.error('-3c needs every access to be simulated and allocated: no -sample, no -nwa')
+    # end
+# end
+
 def parse_args(argv: list[str]) -> Config:
     parser = generate_parser()
     args = parser.parse_known_args(argv)[0]
@@ -44,72 +159,455 @@ def parse_args(argv: list[str]) -> Config:
         i=args.i,
         cs=args.cs,
         bs=args.bs,
-        w=args.w
+        w=args.w,
+        lru=args.lru,
+        policy=args.rp,
+        engine=args.engine,
+        mem_report=args.mem_report,
+        progress=args.progress,
+        sample=args.sample,
+        seed=args.seed,
+        write_policy=args.wp if args.wp else '',
+        write_allocate=not args.nwa,
+        lat_hit=args.lat_hit,
+        lat_victim=args.lat_victim,
+        lat_mem=args.lat_mem,
+        lat_hist=args.lat_hist,
+        classify=args.classify,
+        instrument=args.instrument,
+        checkpoint=args.checkpoint,
+        checkpoint_every=args.checkpoint_every,
+        stop_at=args.stop_at,
+        resume=args.resume,
+        reset_stats=args.reset_stats,
+        jobs=args.jobs,
+        prefetch=args.pf if args.pf else '',
+        prefetch_degree=args.pf_degree
     )
     if args.v:
         config.v = args.v
     # end
 
+    check_config(parser, config)
     return config
 # end
 
-
-def main(argv):
+def parse_args_many(argv: list[str]) -> list[Config]:
+    # -cs/-bs/-w/-v plus one config per -C, every other option shared
+    parser = generate_parser()
+    args = parser.parse_known_args(argv)[0]
     config = parse_args(argv)
 
-    i = config.i
-    cs = config.cs
-    bs = config.bs
-    w = config.w
-    v = config.v
+    configs = [config]
+    for str_cache in args.caches:
+        try:
+            cs, bs, w, *v = [int(str_field) for str_field in str_cache.split(':')]
+        except ValueError:
+            parser.error('-C {} is not CS:BS:W[:V]'.format(str_cache))
+        # end
+        if len(v) > 1 or cs not in Config.CS_RANGE_VALID or bs not in Config.BS_VALID or w not in Config.WAYS_VALID or (v and v[0] not in Config.VICTIM_RANGE_VALID):
+            parser.error('-C {} is not CS:BS:W[:V] within the choices of -cs, -bs, -w and -v'.format(str_cache))
+        # end
+        config_cache = replace(config, cs=cs, bs=bs, w=w, v=v[0] if v else 0)
+        check_config(parser, config_cache)
+        configs.append(config_cache)
+    # end
+
+    if len(configs) > 1 and (config.engine != 'batch' or config.jobs > 1 or config.checkpoint or config.resume or config.stop_at or config.progress):
+        parser.error('-C needs -engine batch, and does not go with --jobs, --checkpoint, --resume, --stop-at or --progress')
+    # end
+    if len(configs) > 1 and (config.instrument or config.lat_hist):
+        parser.error('-C does not go with --instrument or --lat-hist, they write one file per run')
+    # end
+    return configs
+# end
+
+
+@dataclass
+class Result:
+    i: str
+    cs: int
+    bs: int
+    w: int
+    v: int
+
+    hits: int
+    misses: int
+    accesses: int
+    miss_rate: float
+
+    bits_tag: int
+    bits_index: int
+    bits_offset: int
+
+    time_wall: float
+    memory: dict = field(default_factory=dict)  # '<component>.<structure>' -> bytes, only with mem_report
+
+    fraction_sampled: float = 1.0   # sets simulated / all sets, < 1: hits/misses/miss_rate are estimates
+    miss_rate_ci: float = 0.0       # half width of the 95% confidence interval of miss_rate
+
+    write_policy: str = ''          # traffic below is only counted with a write policy
+    bytes_read: int = 0
+    bytes_written: int = 0
+    writebacks: int = 0
+
+    victim_hits: int = 0            # cache misses served by the victim cache, part of hits
+    amat: float = 0.0               # cost model below is only filled with a memory latency
+    stall_cycles: int = 0
+    latency_histogram: dict = field(default_factory=dict)   # latency (cycles) -> accesses
+
+    classified: bool = False        # 3C split of misses, only with classify
+    misses_compulsory: int = 0
+    misses_capacity: int = 0
+    misses_conflict: int = 0
+
+    prefetch: str = ''              # prefetch stats, only with a prefetcher
+    prefetches_issued: int = 0
+    prefetches_useful: int = 0
+    prefetches_unused: int = 0
+    pollution_evictions: int = 0
+    pollution_misses: int = 0
+    prefetch_accuracy: float = 0.0
+    prefetch_coverage: float = 0.0
+# end
+
+
+class Simulation:
+    # one configuration fed the trace chunk by chunk: run() drives one with its checkpoints,
+    # run_many() drives several off a single read/parse of the trace, each decoding with its own
+    # tag/index bits. The action engine keeps its counters on the Action class, so a process runs
+    # one action simulation at a time.
+
+    def __init__(self, config: Config):
+        self.config = config
+        # with jobs the caches live in the workers, this one only gives the decoder
+        self.cache, self.victim, self.decoder = generate_components(config.cs, config.bs, config.w, config.v, lru=config.lru, policy=config.policy, seed=config.seed, num_part=config.jobs)
+        self.classifier = MissClassifier(config.cs, config.bs) if config.classify else None
+        if config.instrument:
+            self.cache.instrument = CacheInstrument(self.cache.shape()[0], self.decoder.bits_index)
+        # end
+        if config.prefetch:
+            self.cache.prefetcher = Prefetcher.get_prefetcher_klass(config.prefetch)(config.prefetch_degree)
+        # end
+
+        # a checkpoint brings its own cache/victim/counters; from another trace it is only a warm start
+        self.offset_byte = 0
+        self.count_all = 0
+        stats_resumed = None
+        if config.resume:
+            checkpoint = load_checkpoint(config.resume, config)
+            self.cache, self.victim, self.classifier = checkpoint.cache, checkpoint.victim, checkpoint.classifier
+            if config.reset_stats:
+                if self.classifier is not None:
+                    self.classifier.reset()
+                # end
+                if self.cache.instrument is not None:
+                    self.cache.instrument.reset()
+                # end
+                if self.cache.prefetcher is not None:
+                    self.cache.prefetcher.stats = PrefetchStats()
+                # end
+            else:
+                stats_resumed = checkpoint.stats
+                self.count_all = checkpoint.count_all
+            # end
+            self.offset_byte = checkpoint.offset_byte if checkpoint.i == config.i else 0
+        # end
+
+        self.mask_set = None
+        self.executor = None
+        match config.engine:
+            case 'batch':
+                self.mask_set = choose_sets(self.cache.shape()[0], config.sample, config.seed) if config.sample < 1 else None
+                self.executor = BatchExecutor(self.cache, self.victim, count_set=self.mask_set is not None or bool(config.instrument), write_policy=config.write_policy or None, write_allocate=config.write_allocate)
+                if stats_resumed is not None:
+                    self.executor.stats = stats_resumed
+                # end
+            case _:
+                Action.clear_state()
+                if stats_resumed is not None:
+                    restore_action(stats_resumed)
+                # end
+            # end case
+        # end match
+    # end
+
+    def feed(self, ops, addresses):
+        # one chunk of raw (ops, addresses) from memtrace, decoded with this configuration's bits
+        if self.classifier is not None:
+            self.classifier.feed(ops, addresses)
+        # end
+        ops, tags, indexes, offsets = self.decoder.decode_addresses(ops, addresses)
+        self.count_all += ops.size
+
+        if self.executor is None:
+            for action in self.decoder.generate_actions(ops, tags, indexes, offsets):
+                action.execute(self.cache, self.victim)
+            # end
+            return
+        # end
+
+        if self.mask_set is not None:   # only the sampled sets reach the cache
+            mask_access = self.mask_set[indexes]
+            ops, tags, indexes = ops[mask_access], tags[mask_access], indexes[mask_access]
+        # end
+        self.executor.execute(ops, tags, indexes)
+    # end
+
+    def get_stats(self) -> ActionStats:
+        if self.executor is None:
+            return stats_from_action()
+        # end
+        self.executor.sync()
+        return self.executor.stats
+    # end
+
+    def take_checkpoint(self, offset_byte):
+        config = self.config
+        save_checkpoint(config.checkpoint, Checkpoint(get_config_state(config), config.i, offset_byte, self.count_all, self.cache, self.victim, self.get_stats(), self.classifier))
+    # end
+
+    def finish(self, time_wall) -> Result:
+        config = self.config
+        cache, victim, decoder = self.cache, self.victim, self.decoder
+        count_all = self.count_all
+        stats = self.get_stats()
+        if self.executor is None:
+            Action.clear_state()
+        # end
+        if cache.instrument is not None:
+            cache.instrument.save(config.instrument, stats)
+        # end
+
+        count_miss = stats.counted_miss
+        count_victim_hit = stats.counted_victim_hit
+        rate_miss_ci = 0.0
+        if self.mask_set is not None:
+            rate_miss, rate_miss_ci = estimate_miss_rate(stats.counted_access_set, stats.counted_miss_set, self.mask_set)
+            count_miss = round(rate_miss * count_all)
+        else:
+            rate_miss = count_miss / count_all if count_all else 0.0
+        # end
+
+        memory = {}
+        if config.mem_report:
+            for name_component, component in (('cache', cache), ('victim', victim)):
+                if component is None:
+                    continue
+                # end
+                for name_structure, nbytes in component.memory_usage().items():
+                    memory['{}.{}'.format(name_component, name_structure)] = nbytes
+                # end
+            # end
+        # end
+
+        report = None
+        if config.lat_mem:
+            model = LatencyModel([config.lat_hit], config.lat_mem, config.lat_victim if victim is not None else None)
+            count_hit = count_all - count_miss
+            report = model.evaluate({'L1': count_hit - count_victim_hit, 'victim': count_victim_hit, 'memory': count_miss})
+            if config.lat_hist:
+                write_histogram(report.histogram, config.lat_hist)
+            # end
+        # end
+
+        classes = self.classifier.classify(count_miss) if self.classifier is not None else None
+        stats_prefetch = cache.prefetcher.stats if cache.prefetcher is not None else PrefetchStats()
+
+        return Result(
+            i=config.i,
+            cs=config.cs,
+            bs=config.bs,
+            w=config.w,
+            v=config.v,
+            hits=count_all - count_miss,
+            misses=count_miss,
+            accesses=count_all,
+            miss_rate=rate_miss,
+            bits_tag=decoder.bits_tag,
+            bits_index=decoder.bits_index,
+            bits_offset=decoder.bits_offset,
+            time_wall=time_wall,
+            memory=memory,
+            fraction_sampled=float(self.mask_set.mean()) if self.mask_set is not None else 1.0,
+            miss_rate_ci=rate_miss_ci,
+            write_policy='' if not config.write_policy else '{}-{}'.format(config.write_policy, 'wa' if config.write_allocate else 'nwa'),
+            bytes_read=stats.bytes_read,
+            bytes_written=stats.bytes_written,
+            writebacks=stats.counted_writeback,
+            victim_hits=count_victim_hit,
+            amat=report.amat() if report is not None else 0.0,
+            stall_cycles=report.stall_cycles if report is not None else 0,
+            latency_histogram=report.histogram if report is not None else {},
+            classified=classes is not None,
+            misses_compulsory=classes.compulsory if classes is not None else 0,
+            misses_capacity=classes.capacity if classes is not None else 0,
+            misses_conflict=classes.conflict if classes is not None else 0,
+            prefetch=config.prefetch,
+            prefetches_issued=stats_prefetch.issued,
+            prefetches_useful=stats_prefetch.useful,
+            prefetches_unused=stats_prefetch.unused,
+            pollution_evictions=stats_prefetch.pollution,
+            pollution_misses=stats_prefetch.pollution_misses,
+            prefetch_accuracy=stats_prefetch.accuracy(),
+            prefetch_coverage=stats_prefetch.coverage(count_miss)
+        )
+    # end
+# end
+
 
-    cache, victim, decoder = generate_components(cs, bs, w, v)
-    with open(i,'r') as file:
-        strs_instruction = file.read().splitlines()
-        for str_instruction in strs_instruction:
-            action = decoder.decode(str_instruction)
-            action.execute(cache, victim)
+def run(config: Config) -> Result:
+    time_start = time.perf_counter()
+    simulation = Simulation(config)
+    count_checkpoint_next = simulation.count_all + config.checkpoint_every if config.checkpoint_every else None
+    num_record_limit = max(0, config.stop_at - simulation.count_all) if config.stop_at else None
+    bar = tqdm(total=count_records(config.i), initial=simulation.count_all, unit='access', unit_scale=True, file=sys.stderr) if config.progress else None
+
+    try:
+        if config.jobs > 1:
+            simulation.executor.stats = run_partitioned(config, min(config.jobs, 1 << simulation.decoder.bits_index))
+            simulation.count_all = simulation.executor.stats.count_all()
+            if bar is not None:
+                bar.update(simulation.count_all)
+            # end
+        else:
+            # reader -> batch decoder -> simulator, one chunk of the trace (text or binary) at a time
+            offset_byte = simulation.offset_byte
+            for ops, addresses, offset_byte in read_chunks_from(config.i, offset_byte, num_record_limit=num_record_limit):
+                simulation.feed(ops, addresses)
+                if bar is not None:
+                    bar.update(ops.size)
+                # end
+                if count_checkpoint_next is not None and simulation.count_all >= count_checkpoint_next:
+                    simulation.take_checkpoint(offset_byte)
+                    count_checkpoint_next = simulation.count_all + config.checkpoint_every
+                # end
+            # end
+            if config.checkpoint:
+                simulation.take_checkpoint(offset_byte)
+            # end
+        # end
+
+        time_wall = time.perf_counter() - time_start
+        if bar is not None:
+            bar.close()
+            print('{} accesses in {:.2f} s, {:.0f} accesses/sec'.format(simulation.count_all, time_wall, simulation.count_all / time_wall), file=sys.stderr)
+        # end
+        return simulation.finish(time_wall)
+    finally:
+        if config.engine == 'action':
+            Action.clear_state()
+        # end
+    # end
+# end
+
+
+def run_many(configs: list[Config]) -> list[Result]:
+    # the configurations share one read and parse of the trace, every chunk goes to each of them;
+    # time_wall of every result is the whole pass
+    if len({config.i for config in configs}) != 1:
+        raise ValueError('configurations simulated together must read the same trace')
+    # end
+    for config in configs:
+        if config.engine != 'batch' or config.jobs > 1 or config.checkpoint or config.resume or config.stop_at or config.progress:
+            raise ValueError('configurations simulated together need -engine batch, no --jobs, --checkpoint, --resume, --stop-at or --progress')
         # end
     # end
 
-    count_miss = Action.counted_miss
-    count_all = sum(Action.counted_action.values())
-    count_hit = count_all - count_miss
-    rate_miss = count_miss / count_all
+    time_start = time.perf_counter()
+    simulations = [Simulation(config) for config in configs]
+    for ops, addresses in read_chunks(configs[0].i):
+        for simulation in simulations:
+            simulation.feed(ops, addresses)
+        # end
+    # end
+    time_wall = time.perf_counter() - time_start
+    return [simulation.finish(time_wall) for simulation in simulations]
+# end
 
-    bits_index = decoder.bits_index
-    bits_offset = decoder.bits_offset
-    bits_tag = decoder.bits_tag
 
+def print_result(result: Result):
     # prepare to print
     annotation_way = None
-    match w:
+    match result.w:
         case 0:
             annotation_way = 'fully-associative'
         case 1:
             annotation_way = 'direct-mapped associativity'
         case _:
-            annotation_way = 'Number of ways = {}'.format(w)
+            annotation_way = 'Number of ways = {}'.format(result.w)
         # end
     # end
 
 
     print('**********************')
-    print('file name: {}'.format(i))
-    print('Cache Size = {} KB'.format(cs))
-    print('Block Size = {} B'.format(bs))
+    print('file name: {}'.format(result.i))
+    print('Cache Size = {} KB'.format(result.cs))
+    print('Block Size = {} B'.format(result.bs))
     print(annotation_way)
-    print('Number of Victim Cache = {}'.format(v))
-    print('numOfOffsetBits = {}'.format(bits_offset))
-    print('numOfIndexBits = {}'.format(bits_index))
-    print('numOfTagBits = {}'.format(bits_tag))
+    print('Number of Victim Cache = {}'.format(result.v))
+    print('numOfOffsetBits = {}'.format(result.bits_offset))
+    print('numOfIndexBits = {}'.format(result.bits_index))
+    print('numOfTagBits = {}'.format(result.bits_tag))
     print()
-    print('Cache hit count = {}'.format(count_hit))
-    print('Cache miss count = {}'.format(count_miss))
-    print('Instruction count = {}'.format(count_all))
-    print('Cache miss rate = {:0.2f}%'.format(rate_miss*100))
+    print('Cache hit count = {}'.format(result.hits))
+    print('Cache miss count = {}'.format(result.misses))
+    print('Instruction count = {}'.format(result.accesses))
+    if result.fraction_sampled < 1:
+        print('Cache miss rate = {:0.2f}% +- {:0.2f}% (95% CI, {:0.1f}% of sets simulated)'.format(result.miss_rate*100, result.miss_rate_ci*100, result.fraction_sampled*100))
+    else:
+        print('Cache miss rate = {:0.2f}%'.format(result.miss_rate*100))
+    # end
+    if result.classified:
+        print('Compulsory miss count = {}'.format(result.misses_compulsory))
+        print('Capacity miss count = {}'.format(result.misses_capacity))
+        print('Conflict miss count = {}'.format(result.misses_conflict))
+    # end
+    if result.v:
+        print('Victim cache hit count = {}'.format(result.victim_hits))
+    # end
+    if result.latency_histogram:
+        print('Average memory access time = {:0.2f} cycles'.format(result.amat))
+        print('Stall cycles = {}'.format(result.stall_cycles))
+    # end
+    if result.write_policy:
+        print()
+        print('Write policy = {}'.format(result.write_policy))
+        print('Bytes read from next level = {}'.format(result.bytes_read))
+        print('Bytes written to next level = {}'.format(result.bytes_written))
+        print('Write-back count = {}'.format(result.writebacks))
+    # end
+    if result.prefetch:
+        print()
+        print('Prefetcher = {}'.format(result.prefetch))
+        print('Prefetches issued = {}'.format(result.prefetches_issued))
+        print('Prefetches useful = {}'.format(result.prefetches_useful))
+        print('Prefetches evicted unused = {}'.format(result.prefetches_unused))
+        print('Pollution evictions = {}'.format(result.pollution_evictions))
+        print('Pollution misses = {}'.format(result.pollution_misses))
+        print('Prefetch accuracy = {:0.2f}%'.format(result.prefetch_accuracy*100))
+        print('Prefetch coverage = {:0.2f}%'.format(result.prefetch_coverage*100))
+    # end
+    if result.memory:
+        print()
+        for name, nbytes in result.memory.items():
+            print('Memory {} = {} B'.format(name, nbytes))
+        # end
+    # end
     print('**********************')
-    Action.clear_state()
+# end
+
+
+def main(argv):
+    configs = parse_args_many(argv)
+    try:
+        results = [run(configs[0])] if len(configs) == 1 else run_many(configs)
+    except (ValueError, RuntimeError) as e:     # a checkpoint or a trace which does not fit, a --jobs worker which died
+        sys.exit('main.py: error: {}'.format(e))
+    # end
+    for result in results:
+        print_result(result)
+    # end
 # end
 
 if __name__ == "__main__":
@@ -0,0 +1,384 @@
+import io
+import os
+import sys
+import bz2
+import gzip
+import lzma
+import zlib
+import queue
+import argparse
+import threading
+import numpy as np
+from itertools import islice
+from typing import Tuple
+
+from decoder import InstructionDecoder
+
+
+# binary trace = { MAGIC(8B) | num_record(uint64, LE) | record * num_record }
+# record = { op(uint8, ord of action) | address(uint32, LE, offset already added and cut to 32 bits) }
+MAGIC = b'MTRACE01'
+DTYPE_HEADER = np.dtype([('magic', 'S8'), ('num_record', '<u8')])
+DTYPE_RECORD = np.dtype([('op', 'u1'), ('address', '<u4')])
+SIZE_HEADER = DTYPE_HEADER.itemsize
+
+NUM_LINE_CHUNK_DEFAULT = 1 << 16
+
+# either trace format may come compressed, told apart by the first bytes of the file
+MAGICS_COMPRESSION = {
+    'gzip': b'\x1f\x8b',
+    'xz': b'\xfd7zXZ\x00',
+    'bz2': b'BZh'
+}
+MODULES_COMPRESSION = {'gzip': gzip, 'xz': lzma, 'bz2': bz2}
+# what the decompressors raise on a truncated or corrupt file (gzip.BadGzipFile is an OSError)
+ERRORS_COMPRESSION = (EOFError, OSError, lzma.LZMAError, zlib.error)
+
+
+class ThreadedReader(io.RawIOBase):
+    # reads (decompresses) the file on a background thread, up to num_block_ahead blocks ahead of the
+    # consumer; zlib/lzma/bz2 let go of the GIL while they work, so this overlaps with the simulation
+
+    SIZE_BLOCK = 1 << 20
+    NUM_BLOCK_AHEAD = 4
+
+    def __init__(self, file, path):
+        self.file = file
+        self.path = path
+        self.blocks = queue.Queue(maxsize=self.__class__.NUM_BLOCK_AHEAD)
+        self.block = memoryview(b'')
+        self.position = 0
+        self.is_eof = False
+        self.error = None   # raised again by every read after the reader thread failed
+        self.is_stopped = threading.Event()
+        self.thread = threading.Thread(target=self._read_ahead, daemon=True)
+        self.thread.start()
+    # end
+
+    def _read_ahead(self):
+        try:
+            while not self.is_stopped.is_set():
+                block = self.file.read(self.__class__.SIZE_BLOCK)
+                self._put(block)    # b'' tells the end
+                if not block:
+                    return
+                # end
+            # end
+        except ERRORS_COMPRESSION as e:     # a broken file, raised to the consumer
+            self._put(ValueError('{}: corrupt compressed trace: {}'.format(self.path, e)))
+        except Exception as e:
+            self._put(e)
+        # end
+    # end
+
+    def _put(self, item):
+        while not self.is_stopped.is_set():
+            try:
+                self.blocks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+            # end
+        # end
+    # end
+
+    def readable(self):
+        return True
+    # end
+
+    def readinto(self, buffer):
+        while self.position >= len(self.block):
+            if self.error is not None:  # the thread is gone, nothing more will come
+                raise self.error
+            # end
+            if self.is_eof:
+                return 0
+            # end
+            item = self.blocks.get()
+            if isinstance(item, Exception):
+                self.error = item
+                raise item
+            # end
+            if not item:
+                self.is_eof = True
+                return 0
+            # end
+            self.block, self.position = memoryview(item), 0
+        # end
+
+        num_byte = min(len(buffer), len(self.block) - self.position)
+        buffer[:num_byte] = self.block[self.position:self.position + num_byte]
+        self.position += num_byte
+        return num_byte
+    # end
+
+    def close(self):
+        if not self.closed:
+            self.is_stopped.set()
+            self.thread.join()
+            self.file.close()
+        # end
+        super().close()
+    # end
+# end
+
+
+def get_compression(path) -> str:
+    # -> key of MAGICS_COMPRESSION, '' for a plain file
+    with open(path, 'rb') as file:
+        head = file.read(max(map(len, MAGICS_COMPRESSION.values())))
+    # end
+    for compression, magic in MAGICS_COMPRESSION.items():
+        if head.startswith(magic):
+            return compression
+        # end
+    # end
+    return ''
+# end
+
+
+def open_decompressed(path):
+    # -> binary file of the (decompressed) content, decompressed on the calling thread
+    compression = get_compression(path)
+    return MODULES_COMPRESSION[compression].open(path, 'rb') if compression else open(path, 'rb')
+# end
+
+
+def open_trace(path, mode='rb'):
+    # -> binary ('rb') or ascii text ('r') file of the trace, compressed ones decompressed on a background thread;
+    # only plain files can seek
+    compression = get_compression(path)
+    if compression:
+        file = io.BufferedReader(ThreadedReader(open_decompressed(path), path), buffer_size=ThreadedReader.SIZE_BLOCK)
+    else:
+        file = open(path, 'rb')
+    # end
+    return io.TextIOWrapper(file, encoding='ascii') if mode == 'r' else file
+# end
+
+
+def skip_bytes(file, num_byte):
+    # file.seek forward for the files which cannot seek
+    while num_byte > 0:
+        block = file.read(min(num_byte, ThreadedReader.SIZE_BLOCK))
+        if not block:
+            break
+        # end
+        num_byte -= len(block)
+    # end
+# end
+
+
+def is_binary(path) -> bool:
+    with open_decompressed(path) as file:
+        try:
+            return file.read(len(MAGIC)) == MAGIC
+        except ERRORS_COMPRESSION as e:
+            raise ValueError('{}: corrupt compressed trace: {}'.format(path, e))
+        # end
+    # end
+# end
+
+
+def read_num_record(file, path) -> int:
+    # -> num_record from the header at the start of a binary trace file
+    header = np.frombuffer(file.read(SIZE_HEADER), dtype=DTYPE_HEADER)
+    if header.size == 0 or header['magic'][0] != MAGIC:
+        raise ValueError('{} is not a binary memtrace'.format(path))
+    # end
+    return int(header['num_record'][0])
+# end
+
+
+def open_binary(path) -> np.memmap:
+    # plain binary traces only, compressed ones are read by read_chunks_from
+    header = np.fromfile(path, dtype=DTYPE_HEADER, count=1)
+    if header.size == 0 or header['magic'][0] != MAGIC:
+        raise ValueError('{} is not a binary memtrace'.format(path))
+    # end
+
+    num_record = int(header['num_record'][0])
+    if num_record == 0:
+        return np.zeros(0, dtype=DTYPE_RECORD)
+    # end
+
+    return np.memmap(path, dtype=DTYPE_RECORD, mode='r', offset=SIZE_HEADER, shape=(num_record,))
+# end
+
+
+def parse_binary(buffer) -> np.ndarray:
+    # binary trace already in memory (bytes, bytearray, memoryview) -> records, a zero-copy view of it
+    header = np.frombuffer(buffer, dtype=DTYPE_HEADER, count=1) if len(buffer) >= SIZE_HEADER else np.zeros(0, dtype=DTYPE_HEADER)
+    if header.size == 0 or header['magic'][0] != MAGIC:
+        raise ValueError('buffer is not a binary memtrace')
+    # end
+
+    num_record = int(header['num_record'][0])
+    if len(buffer) < SIZE_HEADER + num_record * DTYPE_RECORD.itemsize:
+        raise ValueError('buffer is truncated, the header says {} records'.format(num_record))
+    # end
+    return np.frombuffer(buffer, dtype=DTYPE_RECORD, count=num_record, offset=SIZE_HEADER)
+# end
+
+
+def read_trace(path) -> Tuple[np.ndarray, np.ndarray]:
+    # plain binary traces come back as zero-copy views of the mapped file, the others are put
+    # together chunk by chunk, so only the arrays are held and never the whole text
+    if is_binary(path) and not get_compression(path):
+        records = open_binary(path)
+        return records['op'], records['address']
+    # end
+
+    chunks = list(read_chunks(path))
+    if not chunks:
+        return np.zeros(0, dtype=DTYPE_RECORD['op']), np.zeros(0, dtype=DTYPE_RECORD['address'])
+    # end
+    return np.concatenate([ops for ops, _ in chunks]), np.concatenate([addresses for _, addresses in chunks])
+# end
+
+
+def read_chunks(path, num_record_chunk=NUM_LINE_CHUNK_DEFAULT):
+    # -> (ops, addresses) per chunk, memory is bounded by the chunk size whatever the trace length
+    for ops, addresses, _ in read_chunks_from(path, num_record_chunk=num_record_chunk):
+        yield ops, addresses
+    # end
+# end
+
+
+def read_chunks_from(path, offset_byte=0, num_record_chunk=NUM_LINE_CHUNK_DEFAULT, num_record_limit=None):
+    # -> (ops, addresses, byte offset of the next record) per chunk, starting at offset_byte (0: the first
+    # record) and stopping after num_record_limit records; the offsets are where to resume a run from,
+    # in the decompressed content for compressed traces
+    num_record_left = num_record_limit if num_record_limit is not None else -1
+
+    if is_binary(path) and get_compression(path):
+        with open_trace(path) as file:
+            num_record = read_num_record(file, path)
+            offset_byte = max(offset_byte, SIZE_HEADER)
+            if (offset_byte - SIZE_HEADER) % DTYPE_RECORD.itemsize:
+                raise ValueError('{}: byte offset {} is not at a record'.format(path, offset_byte))
+            # end
+            skip_bytes(file, offset_byte - SIZE_HEADER)
+
+            start = (offset_byte - SIZE_HEADER) // DTYPE_RECORD.itemsize
+            stop = num_record if num_record_left < 0 else min(num_record, start + num_record_left)
+            for start_chunk in range(start, stop, num_record_chunk):
+                num_record_read = min(num_record_chunk, stop - start_chunk)
+                chunk = np.frombuffer(file.read(num_record_read * DTYPE_RECORD.itemsize), dtype=DTYPE_RECORD)
+                if chunk.size < num_record_read:
+                    raise ValueError('{}: truncated after {} records'.format(path, start_chunk + chunk.size))
+                # end
+                yield chunk['op'], chunk['address'], SIZE_HEADER + (start_chunk + chunk.size) * DTYPE_RECORD.itemsize
+            # end
+        # end
+        return
+    # end
+
+    if is_binary(path):
+        records = open_binary(path)
+        offset_byte = max(offset_byte, SIZE_HEADER)
+        if (offset_byte - SIZE_HEADER) % DTYPE_RECORD.itemsize:
+            raise ValueError('{}: byte offset {} is not at a record'.format(path, offset_byte))
+        # end
+
+        start = (offset_byte - SIZE_HEADER) // DTYPE_RECORD.itemsize
+        stop = records.size if num_record_left < 0 else min(records.size, start + num_record_left)
+        for start_chunk in range(start, stop, num_record_chunk):
+            chunk = records[start_chunk:min(start_chunk + num_record_chunk, stop)]
+            yield chunk['op'], chunk['address'], SIZE_HEADER + (start_chunk + chunk.size) * DTYPE_RECORD.itemsize
+        # end
+        return
+    # end
+
+    with open_trace(path) as file:     # bytes, so the offsets are exact and file.seek can come back to them
+        if file.seekable():
+            file.seek(offset_byte)
+        else:
+            skip_bytes(file, offset_byte)
+        # end
+        while num_record_left != 0:
+            num_line = num_record_chunk if num_record_left < 0 else min(num_record_chunk, num_record_left)
+            lines = list(islice(file, num_line))
+            if not lines:
+                break
+            # end
+
+            offset_byte += sum(map(len, lines))
+            num_record_left -= sum(not line.isspace() for line in lines) if num_record_left > 0 else 0   # blank lines hold no record
+            ops, addresses = InstructionDecoder.parse_batch([b''.join(lines).decode('ascii')])
+            yield ops, addresses, offset_byte
+        # end
+    # end
+# end
+
+
+def count_records(path):
+    # -> number of records of a binary trace, None for text (unknown without reading it)
+    if not is_binary(path):
+        return None
+    # end
+    with open_decompressed(path) as file:
+        try:
+            return read_num_record(file, path)
+        except ERRORS_COMPRESSION as e:
+            raise ValueError('{}: corrupt compressed trace: {}'.format(path, e))
+        # end
+    # end
+# end
+
+
+def convert(path_text, path_binary, num_line_chunk=NUM_LINE_CHUNK_DEFAULT) -> int:
+    num_record = 0
+    with open_trace(path_text, 'r') as file_text, open(path_binary, 'wb') as file_binary:
+        file_binary.write(np.zeros(1, dtype=DTYPE_HEADER).tobytes())   # patched once the count is known
+
+        while True:
+            strs_instruction = list(islice(file_text, num_line_chunk))
+            if not strs_instruction:
+                break
+            # end
+
+            ops, addresses = InstructionDecoder.parse_batch(strs_instruction)
+            records = np.empty(ops.size, dtype=DTYPE_RECORD)
+            records['op'] = ops
+            records['address'] = addresses
+            file_binary.write(records.tobytes())
+            num_record += records.size
+        # end
+
+        header = np.zeros(1, dtype=DTYPE_HEADER)
+        header['magic'] = MAGIC
+        header['num_record'] = num_record
+        file_binary.seek(0)
+        file_binary.write(header.tobytes())
+    # end
+
+    return num_record
+# end
+
+
+def generate_parser():
+    parser = argparse.ArgumentParser(
+        prog='memtrace.py',
+        description='Convert a text memtrace into the binary memtrace read by main.py and cache_sim.py',
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+
+    parser.add_argument('-i', required=True, type=str, help='Input text memtrace, may be gzip/xz/bz2 compressed')
+    parser.add_argument('-o', type=str, help='(Optional) Output binary memtrace, default: <input>.bin')
+
+    return parser
+# end
+
+
+def main(argv):
+    args = generate_parser().parse_known_args(argv)[0]
+    path_binary = args.o if args.o else '{}.bin'.format(args.i)
+
+    num_record = convert(args.i, path_binary)
+    print('{} -> {}: {} records, {} bytes'.format(args.i, path_binary, num_record, os.path.getsize(path_binary)))
+# end
+
+if __name__ == "__main__":
+    main(sys.argv)
+# end
@@ -0,0 +1,120 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from actions import ActionStats, BatchExecutor
+from factory import generate_components
+from memtrace import read_chunks, is_binary, get_compression
+
+
+# without a victim cache every set only sees its own accesses, so the sets can be split into num_part
+# partitions (index % num_part) simulated by separate processes, and the counts summed exactly.
+# Every worker reads a plain binary trace itself (mapped, not copied) and keeps only its sets. Text and
+# compressed traces are parsed once by the parent, which sends every worker the accesses of its sets.
+# Policies drawing from one random generator for all sets (random, brrip) would draw in another order.
+
+POLICY_SHARED_RNG = ['random', 'brrip']
+
+# what the parent's end of a pipe raises once the worker behind it is gone
+ERRORS_PIPE = (EOFError, BrokenPipeError, ConnectionResetError)
+
+
+def run_partition(config, id_part, num_part) -> ActionStats:
+    cache, victim, decoder = generate_components(config.cs, config.bs, config.w, lru=config.lru, policy=config.policy, seed=config.seed, num_part=num_part)
+    executor = BatchExecutor(cache, victim, write_policy=config.write_policy or None, write_allocate=config.write_allocate)
+
+    for ops, addresses in read_chunks(config.i):
+        ops, tags, indexes, _ = decoder.decode_addresses(ops, addresses)
+        mask_access = indexes % num_part == id_part
+        executor.execute(ops[mask_access], tags[mask_access], indexes[mask_access] // num_part)
+    # end
+    executor.sync()
+    return executor.stats
+# end
+
+
+def run_partition_fed(config, num_part, connection):
+    # the worker of a parsed trace: (ops, tags, indexes) of its sets from the parent until None
+    cache, victim, _ = generate_components(config.cs, config.bs, config.w, lru=config.lru, policy=config.policy, seed=config.seed, num_part=num_part)
+    executor = BatchExecutor(cache, victim, write_policy=config.write_policy or None, write_allocate=config.write_allocate)
+
+    while (chunk := connection.recv()) is not None:
+        executor.execute(*chunk)
+    # end
+    executor.sync()
+    connection.send(executor.stats)
+    connection.close()
+# end
+
+
+def run_partitions_fed(config, num_part) -> list[ActionStats]:
+    _, _, decoder = generate_components(config.cs, config.bs, config.w, num_part=num_part)
+    connections = []
+    processes = []
+    for _ in range(num_part):
+        connection, connection_worker = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=run_partition_fed, args=(config, num_part, connection_worker), daemon=True)
+        process.start()
+        connection_worker.close()
+        connections.append(connection)
+        processes.append(process)
+    # end
+
+    id_part = 0
+    try:
+        for ops, addresses in read_chunks(config.i):
+            ops, tags, indexes, _ = decoder.decode_addresses(ops, addresses)
+            ids_part = indexes % num_part
+            for id_part, connection in enumerate(connections):
+                mask_access = ids_part == id_part
+                connection.send((ops[mask_access], tags[mask_access], indexes[mask_access] // num_part))
+            # end
+        # end
+        for id_part, connection in enumerate(connections):
+            connection.send(None)
+        # end
+        stats_parts = []
+        for id_part, connection in enumerate(connections):
+            stats_parts.append(connection.recv())
+        # end
+        return stats_parts
+    except ERRORS_PIPE as e:
+        process = processes[id_part]
+        process.join(timeout=1)
+        raise RuntimeError('worker of partition {} of {} died (exit code {})'.format(id_part, num_part, process.exitcode)) from e
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            # end
+            process.join()
+        # end
+    # end
+# end
+
+
+def run_partitioned(config, num_part) -> ActionStats:
+    if is_binary(config.i) and not get_compression(config.i):
+        try:
+            with ProcessPoolExecutor(max_workers=num_part) as pool:
+                stats_parts = list(pool.map(run_partition, [config] * num_part, range(num_part), [num_part] * num_part))
+            # end
+        except BrokenProcessPool as e:  # the pool does not tell which one
+            raise RuntimeError('a worker of the {} partitions died'.format(num_part)) from e
+        # end
+    else:
+        stats_parts = run_partitions_fed(config, num_part)
+    # end
+
+    stats = ActionStats()
+    for stats_part in stats_parts:
+        for name_action, count in stats_part.counted_action.items():
+            stats.counted_action[name_action] += count
+        # end
+        stats.counted_miss += stats_part.counted_miss
+        stats.bytes_read += stats_part.bytes_read
+        stats.bytes_written += stats_part.bytes_written
+        stats.counted_writeback += stats_part.counted_writeback
+    # end
+    return stats
+# end
@@ -0,0 +1,460 @@
+import sys
+import math
+import heapq
+import numpy as np
+from abc import ABCMeta, abstractmethod
+
+
+class ReplacementPolicy(metaclass=ABCMeta):
+    # same seam as NwayLRU/ArrayLRU: the cache calls touch on a hit, insert on a fill, get_least to
+    # pick the way to replace and set_least when a way is invalidated. State is one array per policy.
+    # Lines of N_WAYS_WIDE_MIN ways or more (fully associative caches) are never scanned or tabulated per
+    # way: the policies ordered by a key per way keep a heap per line, with stale entries dropped lazily.
+
+    index_name_policy = {}
+    SEED_DEFAULT = 0
+    N_WAYS_WIDE_MIN = 32
+    IS_LEAST_CHEAP = True   # get_least in O(log ways) or better, LineDataWayCache only hashes such backends
+
+    def __init__(self, n_lines, n_ways, seed=SEED_DEFAULT):
+
+        # handle 0 way situation to make fully associate cache with l_lines way
+        if n_ways == 0:
+            n_ways = n_lines
+            n_lines = 1
+        # end
+
+        self.n_lines = n_lines
+        self.n_ways = n_ways
+        self.rng = np.random.default_rng(seed)
+        self.is_wide = n_ways >= self.__class__.N_WAYS_WIDE_MIN
+        self.heaps = None   # per line (key, way), least key on top, only for wide lines of keyed policies
+    # end
+
+    @classmethod
+    @abstractmethod
+    def register_policy(cls):
+        pass
+    # end
+
+    @classmethod
+    def get_policy_klass(cls, str_policy):
+        if str_policy in cls.index_name_policy:
+            return cls.index_name_policy[str_policy]
+        # end
+
+        cls._index_policies()
+        return cls.index_name_policy[str_policy]
+    # end
+
+    @classmethod
+    def list_policies(cls):
+        cls._index_policies()
+        return list(cls.index_name_policy)
+    # end
+
+    @classmethod
+    def _index_policies(cls):
+        subklasses = list(cls.__subclasses__())
+        while subklasses:   # BRRIP is a subclass of SRRIP, walk the whole tree
+            subklass = subklasses.pop(0)
+            cls.index_name_policy[subklass.register_policy()] = subklass
+            subklasses.extend(subklass.__subclasses__())
+        # end
+    # end
+
+    @abstractmethod
+    def touch(self, id_line, id_way):
+        pass
+    # end
+
+    def insert(self, id_line, id_way):
+        self.touch(id_line, id_way)
+    # end
+
+    @abstractmethod
+    def get_least(self, id_line):
+        pass
+    # end
+
+    @abstractmethod
+    def set_least(self, id_line, id_way):
+        pass
+    # end
+
+    def shape(self):
+        return (self.n_lines, self.n_ways)
+    # end
+
+    @abstractmethod
+    def nbytes(self):
+        pass
+    # end
+
+    # heap of the keyed policies (FIFO stamps, LFU counts, SRRIP -RRPV): get_least is the smallest key,
+    # ties to the lowest way, as argmin over the line would give
+
+    def _get_keys(self, id_line):    # -> key of every way of the line
+        raise NotImplementedError()
+    # end
+
+    def _get_key(self, id_line, id_way):
+        raise NotImplementedError()
+    # end
+
+    def _init_heaps(self):
+        self.heaps = [None] * self.n_lines
+        for id_line in range(self.n_lines):
+            self._rebuild_heap(id_line)
+        # end
+    # end
+
+    def _rebuild_heap(self, id_line):
+        heap = list(zip(self._get_keys(id_line).tolist(), range(self.n_ways)))
+        heapq.heapify(heap)
+        self.heaps[id_line] = heap
+    # end
+
+    def _push_key(self, id_line, id_way):
+        heap = self.heaps[id_line]
+        heapq.heappush(heap, (self._get_key(id_line, id_way), id_way))
+        if len(heap) > 2 * self.n_ways:     # mostly stale, a rebuild every n_ways pushes is O(1) each
+            self._rebuild_heap(id_line)
+        # end
+    # end
+
+    def _get_top(self, id_line):    # -> (key, way) of the least way
+        heap = self.heaps[id_line]
+        while heap[0][0] != self._get_key(id_line, heap[0][1]):
+            heapq.heappop(heap)
+        # end
+        return heap[0]
+    # end
+
+    def _nbytes_heaps(self):
+        # estimate: a list slot and a (key, way) tuple per entry, keys beyond the small int cache
+        if self.heaps is None:
+            return 0
+        # end
+        size_entry = 8 + sys.getsizeof((0, 0)) + sys.getsizeof(1 << 40)
+        return sum(map(len, self.heaps)) * size_entry
+    # end
+# end
+
+
+class TreePLRU(ReplacementPolicy):
+    # one bit per inner node of a binary tree over the ways (heap order, root = 0),
+    # bit 0: the pseudo least way is on the left, 1: on the right
+
+    @classmethod
+    def register_policy(cls):
+        return 'plru'
+    # end
+
+    def __init__(self, n_lines, n_ways, seed=ReplacementPolicy.SEED_DEFAULT):
+        super().__init__(n_lines, n_ways, seed)
+        if self.n_ways & (self.n_ways - 1):
+            raise ValueError('tree-PLRU needs a power of two ways, got {}'.format(self.n_ways))
+        # end
+
+        depth = int(math.log(self.n_ways, 2))
+        self.depth = depth
+        self.bits = np.zeros((self.n_lines, max(self.n_ways - 1, 1)), dtype=np.uint8)
+
+        # the path of a way: at level l the node (2^l - 1) + (way >> (depth - l)), the bit pointing away
+        # from it is the flipped bit (depth - 1 - l) of the way. Tabulated for every way of a narrow line,
+        # worked out per call for a wide one
+        levels = np.arange(depth, dtype=np.int64)
+        self.offsets_level = (1 << levels) - 1
+        self.shifts_node = depth - levels
+        self.shifts_direction = depth - 1 - levels
+        self.nodes_path = None
+        self.bits_away = None
+        if not self.is_wide:
+            ids_way = np.arange(self.n_ways, dtype=np.int64)[:, None]
+            self.nodes_path = self.offsets_level + (ids_way >> self.shifts_node)
+            self.bits_away = (1 - ((ids_way >> self.shifts_direction) & 1)).astype(np.uint8)
+        # end
+    # end
+
+    def get_path(self, id_way):    # -> (nodes, bits pointing away from the way)
+        if self.nodes_path is not None:
+            return self.nodes_path[id_way], self.bits_away[id_way]
+        # end
+        return self.offsets_level + (id_way >> self.shifts_node), 1 - ((id_way >> self.shifts_direction) & 1)
+    # end
+
+    def touch(self, id_line, id_way):
+        nodes, bits_away = self.get_path(id_way)
+        self.bits[id_line, nodes] = bits_away
+    # end
+
+    def get_least(self, id_line):
+        bits = self.bits[id_line]
+        node, id_way = 0, 0
+        for _ in range(self.depth):
+            direction = int(bits[node])
+            id_way = 2 * id_way + direction
+            node = 2 * node + 1 + direction
+        # end
+        return id_way
+    # end
+
+    def set_least(self, id_line, id_way):
+        nodes, bits_away = self.get_path(id_way)
+        self.bits[id_line, nodes] = 1 - bits_away
+    # end
+
+    def nbytes(self):
+        return self.bits.nbytes
+    # end
+# end
+
+
+class SRRIP(ReplacementPolicy):
+    # static re-reference interval prediction, 2-bit RRPV per way: 0 = near, RRPV_MAX = distant.
+    # get_least does not age the line (it is also asked on hits), the aging happens on insert.
+    # A wide line keeps RRPV - age of the line per way, so aging is one add to ages, and a heap of -RRPV.
+
+    RRPV_MAX = 3
+
+    @classmethod
+    def register_policy(cls):
+        return 'srrip'
+    # end
+
+    def __init__(self, n_lines, n_ways, seed=ReplacementPolicy.SEED_DEFAULT):
+        super().__init__(n_lines, n_ways, seed)
+        self.rrpv = np.full((self.n_lines, self.n_ways), self.__class__.RRPV_MAX, dtype=np.int64 if self.is_wide else np.uint8)
+        self.ages = None
+        if self.is_wide:
+            self.ages = [0] * self.n_lines
+            self._init_heaps()
+        # end
+    # end
+
+    def get_rrpv_insert(self):
+        return self.__class__.RRPV_MAX - 1     # long re-reference interval
+    # end
+
+    def _get_keys(self, id_line):
+        return -self.rrpv[id_line]
+    # end
+
+    def _get_key(self, id_line, id_way):
+        return -int(self.rrpv[id_line, id_way])
+    # end
+
+    def _set_rrpv(self, id_line, id_way, rrpv):
+        if self.ages is None:
+            self.rrpv[id_line, id_way] = rrpv
+            return
+        # end
+        self.rrpv[id_line, id_way] = rrpv - self.ages[id_line]
+        self._push_key(id_line, id_way)
+    # end
+
+    def touch(self, id_line, id_way):
+        self._set_rrpv(id_line, id_way, 0)
+    # end
+
+    def insert(self, id_line, id_way):
+        if self.ages is None:
+            rrpv = self.rrpv[id_line]
+            rrpv += self.__class__.RRPV_MAX - rrpv.max()    # age until some way is distant
+        else:
+            self.ages[id_line] += self.__class__.RRPV_MAX - (self.ages[id_line] - self._get_top(id_line)[0])
+        # end
+        self._set_rrpv(id_line, id_way, self.get_rrpv_insert())
+    # end
+
+    def get_least(self, id_line):
+        if self.ages is None:
+            return int(self.rrpv[id_line].argmax())     # first way which reaches RRPV_MAX first
+        # end
+        return self._get_top(id_line)[1]
+    # end
+
+    def set_least(self, id_line, id_way):
+        self._set_rrpv(id_line, id_way, self.__class__.RRPV_MAX)
+    # end
+
+    def nbytes(self):
+        return self.rrpv.nbytes + self._nbytes_heaps()
+    # end
+# end
+
+
+class BRRIP(SRRIP):
+    # bimodal RRIP: insert distant, only once in a while (EPSILON) long
+
+    EPSILON = 1 / 32
+
+    @classmethod
+    def register_policy(cls):
+        return 'brrip'
+    # end
+
+    def get_rrpv_insert(self):
+        if self.rng.random() < self.__class__.EPSILON:
+            return self.__class__.RRPV_MAX - 1
+        # end
+        return self.__class__.RRPV_MAX
+    # end
+# end
+
+
+class FIFO(ReplacementPolicy):
+    # fill stamps, hits do not change the order
+
+    @classmethod
+    def register_policy(cls):
+        return 'fifo'
+    # end
+
+    def __init__(self, n_lines, n_ways, seed=ReplacementPolicy.SEED_DEFAULT):
+        super().__init__(n_lines, n_ways, seed)
+        self.stamps = np.empty((self.n_lines, self.n_ways), dtype=np.int64)
+        self.stamps[:] = np.arange(self.n_ways, dtype=np.int64) - self.n_ways
+        self.stamp_next = 0
+        if self.is_wide:
+            self._init_heaps()
+        # end
+    # end
+
+    def _get_keys(self, id_line):
+        return self.stamps[id_line]
+    # end
+
+    def _get_key(self, id_line, id_way):
+        return int(self.stamps[id_line, id_way])
+    # end
+
+    def touch(self, id_line, id_way):
+        pass
+    # end
+
+    def insert(self, id_line, id_way):
+        self.stamps[id_line, id_way] = self.stamp_next
+        self.stamp_next += 1
+        if self.heaps is not None:
+            self._push_key(id_line, id_way)
+        # end
+    # end
+
+    def get_least(self, id_line):
+        if self.heaps is not None:
+            return self._get_top(id_line)[1]
+        # end
+        return int(self.stamps[id_line].argmin())
+    # end
+
+    def set_least(self, id_line, id_way):
+        if self.heaps is not None:
+            self.stamps[id_line, id_way] = self._get_top(id_line)[0] - 1
+            self._push_key(id_line, id_way)
+            return
+        # end
+        self.stamps[id_line, id_way] = self.stamps[id_line].min() - 1
+    # end
+
+    def nbytes(self):
+        return self.stamps.nbytes + self._nbytes_heaps()
+    # end
+# end
+
+
+class RandomPolicy(ReplacementPolicy):
+    # the next victim of every line is drawn (seeded) when the previous one is replaced,
+    # so get_least gives the same answer until the line is filled
+
+    @classmethod
+    def register_policy(cls):
+        return 'random'
+    # end
+
+    def __init__(self, n_lines, n_ways, seed=ReplacementPolicy.SEED_DEFAULT):
+        super().__init__(n_lines, n_ways, seed)
+        self.victims = self.rng.integers(0, self.n_ways, size=self.n_lines, dtype=np.int64)
+    # end
+
+    def touch(self, id_line, id_way):
+        pass
+    # end
+
+    def insert(self, id_line, id_way):
+        self.victims[id_line] = self.rng.integers(0, self.n_ways)
+    # end
+
+    def get_least(self, id_line):
+        return int(self.victims[id_line])
+    # end
+
+    def set_least(self, id_line, id_way):
+        self.victims[id_line] = id_way
+    # end
+
+    def nbytes(self):
+        return self.victims.nbytes
+    # end
+# end
+
+
+class LFU(ReplacementPolicy):
+    # access count since fill, ties go to the lowest way
+
+    @classmethod
+    def register_policy(cls):
+        return 'lfu'
+    # end
+
+    def __init__(self, n_lines, n_ways, seed=ReplacementPolicy.SEED_DEFAULT):
+        super().__init__(n_lines, n_ways, seed)
+        self.counts = np.zeros((self.n_lines, self.n_ways), dtype=np.int64)
+        if self.is_wide:
+            self._init_heaps()
+        # end
+    # end
+
+    def _get_keys(self, id_line):
+        return self.counts[id_line]
+    # end
+
+    def _get_key(self, id_line, id_way):
+        return int(self.counts[id_line, id_way])
+    # end
+
+    def touch(self, id_line, id_way):
+        self.counts[id_line, id_way] += 1
+        if self.heaps is not None:
+            self._push_key(id_line, id_way)
+        # end
+    # end
+
+    def insert(self, id_line, id_way):
+        self.counts[id_line, id_way] = 1
+        if self.heaps is not None:
+            self._push_key(id_line, id_way)
+        # end
+    # end
+
+    def get_least(self, id_line):
+        if self.heaps is not None:
+            return self._get_top(id_line)[1]
+        # end
+        return int(self.counts[id_line].argmin())
+    # end
+
+    def set_least(self, id_line, id_way):
+        if self.heaps is not None:
+            self.counts[id_line, id_way] = self._get_top(id_line)[0] - 1
+            self._push_key(id_line, id_way)
+            return
+        # end
+        self.counts[id_line, id_way] = self.counts[id_line].min() - 1
+    # end
+
+    def nbytes(self):
+        return self.counts.nbytes + self._nbytes_heaps()
+    # end
+# end
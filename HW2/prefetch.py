@@ -0,0 +1,186 @@
+from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+
+
+# hardware prefetchers working on block numbers (address >> offset bits). The executor tells them
+# every demand access which missed or hit a block brought in by a prefetch (a trigger), they answer
+# with the blocks to bring in; the executor fills those through store_direct and keeps the stats.
+# The trace has no PC, so every "per-stream" table is keyed by the memory region of the access.
+
+
+@dataclass
+class PrefetchStats:
+    issued: int = 0         # prefetch fills, blocks already cached are not issued
+    useful: int = 0         # prefetched blocks hit by a demand access before eviction
+    unused: int = 0         # prefetched blocks evicted before any demand access
+    pollution: int = 0      # demand blocks evicted by a prefetch fill
+    pollution_misses: int = 0   # demand misses on a block a prefetch fill had evicted
+
+    def accuracy(self):
+        return self.useful / self.issued if self.issued else 0.0
+    # end
+
+    def coverage(self, count_miss):
+        # misses removed / misses there would have been
+        return self.useful / (self.useful + count_miss) if self.useful + count_miss else 0.0
+    # end
+# end
+
+
+class Prefetcher(metaclass=ABCMeta):
+
+    index_name_prefetcher = {}
+    DEGREE_DEFAULT = 1
+
+    def __init__(self, degree=0):
+        self.degree = degree if degree > 0 else self.__class__.DEGREE_DEFAULT
+        self.stats = PrefetchStats()
+        self.ways_prefetched = set()    # (index, way) filled by a prefetch and not used yet
+        self.blocks_evicted = set()     # demand blocks evicted by a prefetch fill and not back since
+    # end
+
+    @classmethod
+    @abstractmethod
+    def register_prefetcher(cls):
+        pass
+    # end
+
+    @classmethod
+    def get_prefetcher_klass(cls, str_prefetcher):
+        if str_prefetcher not in cls.index_name_prefetcher:
+            cls._index_prefetchers()
+        # end
+        return cls.index_name_prefetcher[str_prefetcher]
+    # end
+
+    @classmethod
+    def list_prefetchers(cls):
+        cls._index_prefetchers()
+        return list(cls.index_name_prefetcher)
+    # end
+
+    @classmethod
+    def _index_prefetchers(cls):
+        for subklass in cls.__subclasses__():
+            cls.index_name_prefetcher[subklass.register_prefetcher()] = subklass
+        # end
+    # end
+
+    @abstractmethod
+    def on_access(self, block, is_miss) -> list[int]:    # -> blocks to prefetch
+        pass
+    # end
+# end
+
+
+class NextLinePrefetcher(Prefetcher):
+    # tagged next-line: a miss or the first hit on a prefetched block brings in the next degree blocks
+
+    @classmethod
+    def register_prefetcher(cls):
+        return 'nextline'
+    # end
+
+    def on_access(self, block, is_miss):
+        return [block + distance for distance in range(1, self.degree + 1)]
+    # end
+# end
+
+
+class StridePrefetcher(Prefetcher):
+    # reference prediction table keyed by region: last block, stride and a 2-bit confidence,
+    # prefetches degree strides ahead once the same stride was seen twice in a row
+
+    DEGREE_DEFAULT = 2
+    BITS_REGION = 6             # 64 blocks per region
+    NUM_ENTRY_TABLE = 64
+    CONFIDENCE_MAX = 3
+    CONFIDENCE_PREFETCH = 2
+
+    @classmethod
+    def register_prefetcher(cls):
+        return 'stride'
+    # end
+
+    def __init__(self, degree=0):
+        super().__init__(degree)
+        self.table = OrderedDict()  # region -> [last block, stride, confidence], least -> most recent
+    # end
+
+    def on_access(self, block, is_miss):
+        klass = self.__class__
+        region = block >> klass.BITS_REGION
+        entry = self.table.get(region)
+        if entry is None:
+            if len(self.table) >= klass.NUM_ENTRY_TABLE:
+                self.table.popitem(last=False)
+            # end
+            self.table[region] = [block, 0, 0]
+            return []
+        # end
+
+        self.table.move_to_end(region)
+        stride = block - entry[0]
+        if stride == 0:
+            return []
+        # end
+
+        if stride == entry[1]:
+            entry[2] = min(entry[2] + 1, klass.CONFIDENCE_MAX)
+        else:
+            entry[1] = stride
+            entry[2] = 0
+        # end
+        entry[0] = block
+
+        if entry[2] < klass.CONFIDENCE_PREFETCH:
+            return []
+        # end
+        return [block + stride * distance for distance in range(1, self.degree + 1)]
+    # end
+# end
+
+
+class StreamBufferPrefetcher(Prefetcher):
+    # a few sequential streams, each prefetching degree blocks ahead of its last access. A miss outside
+    # every stream starts a new one (replacing the least recent), an access inside a stream moves it on.
+    # The streams fill the cache, there is no separate buffer to look up.
+
+    DEGREE_DEFAULT = 4
+    NUM_STREAM = 4
+
+    @classmethod
+    def register_prefetcher(cls):
+        return 'stream'
+    # end
+
+    def __init__(self, degree=0):
+        super().__init__(degree)
+        self.streams = OrderedDict()    # id -> [last block accessed, last block prefetched], least -> most recent
+        self.id_stream_next = 0
+    # end
+
+    def on_access(self, block, is_miss):
+        for id_stream, stream in self.streams.items():
+            if stream[0] < block <= stream[1]:
+                self.streams.move_to_end(id_stream)
+                blocks = list(range(stream[1] + 1, block + self.degree + 1))
+                stream[0] = block
+                stream[1] = max(stream[1], block + self.degree)
+                return blocks
+            # end
+        # end
+
+        if not is_miss:
+            return []
+        # end
+
+        if len(self.streams) >= self.__class__.NUM_STREAM:
+            self.streams.popitem(last=False)
+        # end
+        self.streams[self.id_stream_next] = [block, block + self.degree]
+        self.id_stream_next += 1
+        return list(range(block + 1, block + self.degree + 1))
+    # end
+# end
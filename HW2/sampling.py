@@ -0,0 +1,46 @@
+import math
+import numpy as np
+from typing import Tuple
+
+
+# set sampling: sets are independent under per-set LRU (no victim cache), so simulating a random
+# subset of sets gives an unbiased miss rate; the sampled sets are the clusters of a ratio estimator
+#   r = sum(misses_i) / sum(accesses_i)
+#   var(r) ~= (1 - f) / (n * mean(accesses_i)^2) * sum((misses_i - r * accesses_i)^2) / (n - 1)
+
+Z_CONFIDENCE = {0.90: 1.645, 0.95: 1.960, 0.99: 2.576}
+CONFIDENCE_DEFAULT = 0.95
+
+
+def choose_sets(num_set, fraction, seed=0) -> np.ndarray:
+    # -> bool mask over the sets, True = simulated
+    num_set_sampled = min(num_set, max(1, round(fraction * num_set)))
+    rng = np.random.default_rng(seed)
+
+    mask_set = np.zeros(num_set, dtype=np.bool_)
+    mask_set[rng.choice(num_set, num_set_sampled, replace=False)] = True
+    return mask_set
+# end
+
+
+def estimate_miss_rate(counted_access_set, counted_miss_set, mask_set, confidence=CONFIDENCE_DEFAULT) -> Tuple[float, float]:
+    # -> (miss rate, half width of the confidence interval)
+    accesses = np.asarray(counted_access_set, dtype=np.float64)[mask_set]
+    misses = np.asarray(counted_miss_set, dtype=np.float64)[mask_set]
+
+    num_set_sampled = accesses.size
+    count_access = accesses.sum()
+    if count_access == 0:
+        return 0.0, 0.0
+    # end
+
+    rate_miss = misses.sum() / count_access
+    if num_set_sampled < 2:
+        return rate_miss, math.inf
+    # end
+
+    fraction = num_set_sampled / mask_set.size
+    residual = misses - rate_miss * accesses
+    var_rate = (1 - fraction) / (num_set_sampled * accesses.mean()**2) * (residual**2).sum() / (num_set_sampled - 1)
+    return rate_miss, Z_CONFIDENCE[confidence] * math.sqrt(var_rate)
+# end
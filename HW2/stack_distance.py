@@ -0,0 +1,251 @@
+import sys
+import math
+import argparse
+import numpy as np
+from operator import itemgetter
+
+from memtrace import read_chunks
+
+
+# Mattson stack distance: under LRU, an access hits in a set with n_ways ways iff fewer than n_ways
+# distinct blocks of the same set were touched since the previous access to its block.
+# So one pass that records every access's stack distance gives the hit count of every cache size.
+#
+#   - fully associative (1 set): distances are unbounded, counted with a Fenwick tree over the
+#     slots of the last access of every block -> O(log n) per access. Every access takes a new slot;
+#     when they run out the live blocks are renumbered 0..distinct-1 and the tree is rebuilt at least
+#     twice that size, so it stays O(distinct blocks) and not O(accesses)
+#   - n_sets = 2^bits_index: distances only matter below the largest way count main.py accepts,
+#     so every set keeps a bounded MRU-first stack of depth DEPTH_SET_DEFAULT -> O(depth) per access
+# The trace is fed chunk by chunk: memory is O(distinct blocks + sets * depth), whatever its length.
+
+CS_ALL_KB = [2**i for i in range(0, 12+1)]      # 1KB ... 4096KB
+WAYS_ALL = [0, 1, 2, 4, 8, 16]                  # same as main.Config.WAYS_VALID
+DEPTH_SET_DEFAULT = 16
+SIZE_TREE_MIN = 1 << 16
+
+
+class StackDistanceEngine:
+
+    def __init__(self, size_data_cache_b, list_bits_index, depth_set=DEPTH_SET_DEFAULT, size_tree=SIZE_TREE_MIN):
+        self.size_data_cache_b = size_data_cache_b
+        self.bits_offset = int(math.log(size_data_cache_b, 2))
+        self.depth_set = depth_set
+
+        # fully associative: fenwick tree marks the slot of the latest access of every distinct block
+        self.tree = [0] * (size_tree + 1)
+        self.slot_last = {}
+        self.slot = 0               # next free slot
+        self.num_distinct = 0
+        self.num_access = 0
+        self.histogram_fa = []      # histogram_fa[d]: accesses at stack distance d, first touches apart
+
+        # n_sets > 1: one bounded stack per set, histogram[depth_set] counts misses (cold or too far)
+        self.levels = [(bits_index, {}, [0] * (depth_set + 1)) for bits_index in sorted(set(list_bits_index)) if bits_index > 0]
+    # end
+
+    def feed(self, addresses):
+        blocks = (np.asarray(addresses, dtype=np.uint32) >> np.uint32(self.bits_offset)).tolist()
+
+        tree = self.tree
+        size_tree = len(tree) - 1
+        slot_last = self.slot_last
+        histogram_fa = self.histogram_fa
+        levels = self.levels
+        depth_set = self.depth_set
+        num_distinct = self.num_distinct
+        slot = self.slot
+
+        for block in blocks:
+            if slot == size_tree:
+                self.num_distinct, self.slot = num_distinct, slot
+                self._compact()
+                tree, slot = self.tree, self.slot
+                size_tree = len(tree) - 1
+            # end
+
+            slot_previous = slot_last.get(block)
+            if slot_previous is not None:
+                # distinct blocks touched after slot_previous = all marks - marks in [0, slot_previous]
+                count_before = 0
+                j = slot_previous + 1
+                while j > 0:
+                    count_before += tree[j]
+                    j -= j & -j
+                # end
+                distance = num_distinct - count_before
+                if distance >= len(histogram_fa):
+                    histogram_fa.extend([0] * (distance + 1 - len(histogram_fa)))
+                # end
+                histogram_fa[distance] += 1
+
+                j = slot_previous + 1
+                while j <= size_tree:
+                    tree[j] -= 1
+                    j += j & -j
+                # end
+                num_distinct -= 1
+            # end
+
+            j = slot + 1
+            while j <= size_tree:
+                tree[j] += 1
+                j += j & -j
+            # end
+            num_distinct += 1
+            slot_last[block] = slot
+            slot += 1
+
+            for bits_index, stacks, histogram in levels:
+                index = block & ((1 << bits_index) - 1)
+                stack = stacks.get(index)
+                if stack is None:
+                    stack = stacks[index] = []
+                # end
+
+                try:
+                    distance = stack.index(block)
+                    del stack[distance]
+                except ValueError:
+                    distance = depth_set
+                    if len(stack) == depth_set:
+                        stack.pop()
+                    # end
+                # end
+                histogram[distance] += 1
+                stack.insert(0, block)
+            # end
+        # end
+
+        self.num_distinct = num_distinct
+        self.num_access += len(blocks)
+        self.slot = slot
+    # end
+
+    def _compact(self):
+        # live blocks to slots 0..num_distinct-1 in the same order, in a tree with room for as many new accesses
+        slot_last = self.slot_last
+        for slot, (block, _) in enumerate(sorted(slot_last.items(), key=itemgetter(1))):
+            slot_last[block] = slot
+        # end
+
+        size_tree = max(len(self.tree) - 1, 2 * self.num_distinct)
+        tree = [0] * (size_tree + 1)
+        for i in range(1, self.num_distinct + 1):
+            tree[i] = 1
+        # end
+        for i in range(1, size_tree + 1):   # linear fenwick build: every node adds itself to its parent
+            j = i + (i & -i)
+            if j <= size_tree:
+                tree[j] += tree[i]
+            # end
+        # end
+        self.tree = tree
+        self.slot = self.num_distinct
+    # end
+
+    def count_hits(self, bits_index, n_ways):
+        if bits_index == 0:
+            return sum(self.histogram_fa[:n_ways])
+        # end
+
+        if n_ways > self.depth_set:
+            raise ValueError('set stacks only track distances below {}'.format(self.depth_set))
+        # end
+
+        for bits_index_level, _, histogram in self.levels:
+            if bits_index_level == bits_index:
+                return sum(histogram[:n_ways])
+            # end
+        # end
+        raise ValueError('2^{} sets was not tracked'.format(bits_index))
+    # end
+# end
+
+
+def generate_configs(size_data_cache_b, list_cs=CS_ALL_KB, list_w=WAYS_ALL):
+    # -> (cs, w, n_sets, n_ways), same geometry as factory.generate_components
+    configs = []
+    for cs in list_cs:
+        num_lines_total = int(1024 * cs / size_data_cache_b)
+        for w in list_w:
+            if w > num_lines_total:
+                continue
+            # end
+            n_sets, n_ways = (1, num_lines_total) if w == 0 else (int(num_lines_total / w), w)
+            configs.append((cs, w, n_sets, n_ways))
+        # end
+    # end
+    return configs
+# end
+
+
+def simulate_all(addresses, size_data_cache_b, list_cs=CS_ALL_KB, list_w=WAYS_ALL):
+    return simulate_chunks([addresses], size_data_cache_b, list_cs, list_w)
+# end
+
+
+def simulate_chunks(chunks_address, size_data_cache_b, list_cs=CS_ALL_KB, list_w=WAYS_ALL):
+    # chunks_address: the addresses of the trace, one array per chunk
+    configs = generate_configs(size_data_cache_b, list_cs, list_w)
+    list_bits_index = [int(math.log(n_sets, 2)) for _, _, n_sets, _ in configs]
+
+    engine = StackDistanceEngine(size_data_cache_b, list_bits_index)
+    for addresses in chunks_address:
+        engine.feed(addresses)
+    # end
+
+    count_all = engine.num_access
+    results = []
+    for (cs, w, n_sets, n_ways), bits_index in zip(configs, list_bits_index):
+        count_hit = engine.count_hits(bits_index, n_ways)
+        results.append({
+            'cs': cs,
+            'bs': size_data_cache_b,
+            'w': w,
+            'hits': count_hit,
+            'misses': count_all - count_hit,
+            'accesses': count_all,
+            'miss_rate': (count_all - count_hit) / count_all if count_all else 0.0
+        })
+    # end
+    return results
+# end
+
+
+def generate_parser():
+    parser = argparse.ArgumentParser(
+        prog='stack_distance.py',
+        description='LRU miss rates of every cache size (1-4096KB) and way count in a single pass.\n'
+                    'Memory grows with the distinct blocks of the trace (one dict entry and two tree slots each), not with its length',
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+
+    parser.add_argument('-i', required=True, type=str, help='Input file (text memtrace or binary memtrace from memtrace.py)')
+    parser.add_argument('-bs', required=True, type=int, choices=[2,4,8,16,32,64], help='Cache Block Size(B)')
+
+    return parser
+# end
+
+
+def main(argv):
+    args = generate_parser().parse_known_args(argv)[0]
+
+    results = simulate_chunks((addresses for _, addresses in read_chunks(args.i)), args.bs)
+
+    print('**********************')
+    print('file name: {}'.format(args.i))
+    print('Block Size = {} B'.format(args.bs))
+    print('Instruction count = {}'.format(results[0]['accesses'] if results else 0))
+    print()
+    print('{:>8} {:>6} {:>10} {:>10} {:>8}'.format('cs(KB)', 'ways', 'hits', 'misses', 'miss%'))
+    for result in results:
+        annotation_way = 'fa' if result['w'] == 0 else str(result['w'])
+        print('{:>8} {:>6} {:>10} {:>10} {:>7.2f}%'.format(result['cs'], annotation_way, result['hits'], result['misses'], result['miss_rate']*100))
+    # end
+    print('**********************')
+# end
+
+if __name__ == "__main__":
+    main(sys.argv)
+# end
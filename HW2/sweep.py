@@ -0,0 +1,116 @@
+import os
+import sys
+import csv
+import json
+import argparse
+import itertools
+from dataclasses import asdict, fields
+from concurrent.futures import ProcessPoolExecutor
+
+from main import Config, Result, run, run_many
+
+
+# columns of one output row, the dict fields (memory, latency_histogram) are left out of the csv
+COLUMNS_ROW = [f.name for f in fields(Result) if f.name not in ('memory', 'latency_histogram')]
+
+
+def generate_configs(list_i, list_cs, list_bs, list_w, list_v, lru='chain') -> list[Config]:
+    configs = []
+    for i, cs, bs, w, v in itertools.product(list_i, list_cs, list_bs, list_w, list_v):
+        num_lines_total = int(1024 * cs / bs)
+        if w > num_lines_total:     # more ways than lines, no such cache
+            continue
+        # end
+        configs.append(Config(i=i, cs=cs, bs=bs, w=w, v=v, lru=lru))
+    # end
+    return configs
+# end
+
+
+def run_sweep(configs: list[Config], jobs=None, fanout=False) -> list[Result]:
+    # every config runs in a worker process; run() resets the Action counters before and after,
+    # and a worker only ever runs one config at a time, so configs never share counters
+    if not fanout:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            return list(executor.map(run, configs))
+        # end
+    # end
+    if not configs:
+        return []
+    # end
+
+    # fanout: a worker reads and parses a trace once for a group of its configs (run_many),
+    # the configs of a trace are dealt into as many groups as there are workers per trace
+    ids_config_i = {}
+    for id_config, config in enumerate(configs):
+        ids_config_i.setdefault(config.i, []).append(id_config)
+    # end
+    num_group_i = max(1, (jobs or os.cpu_count()) // len(ids_config_i))
+    groups = [ids_config[id_group::num_group_i] for ids_config in ids_config_i.values() for id_group in range(num_group_i)]
+    groups = [ids_config for ids_config in groups if ids_config]
+
+    results = [None] * len(configs)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        results_group = executor.map(run_many, [[configs[id_config] for id_config in ids_config] for ids_config in groups])
+        for ids_config, results_ids in zip(groups, results_group):
+            for id_config, result in zip(ids_config, results_ids):
+                results[id_config] = result
+            # end
+        # end
+    # end
+    return results
+# end
+
+
+def write_results(results: list[Result], path_output):
+    rows = [{name: getattr(result, name) for name in COLUMNS_ROW} for result in results]
+
+    if path_output.endswith('.json'):
+        with open(path_output, 'w') as file:
+            json.dump([asdict(result) for result in results], file, indent=2)
+        # end
+        return
+    # end
+
+    with open(path_output, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=COLUMNS_ROW)
+        writer.writeheader()
+        writer.writerows(rows)
+    # end
+# end
+
+
+def generate_parser():
+    parser = argparse.ArgumentParser(
+        prog='sweep.py',
+        description='Run main.py configurations over a grid of traces x cs x bs x w x v on all cores',
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+
+    parser.add_argument('-i', required=True, type=str, nargs='+', help='Input files')
+    parser.add_argument('-cs', required=True, type=int, nargs='+', choices=Config.CS_RANGE_VALID, metavar='[1-4096]', help='Total Cache Sizes(KB)')
+    parser.add_argument('-bs', required=True, type=int, nargs='+', choices=Config.BS_VALID, help='Cache Block Sizes(B), {}'.format(Config.BS_VALID))
+    parser.add_argument('-w', required=True, type=int, nargs='+', choices=Config.WAYS_VALID, help='Numbers of Ways {}'.format(Config.WAYS_VALID))
+    parser.add_argument('-v', type=int, nargs='+', default=[0], choices=[0, *Config.VICTIM_RANGE_VALID], metavar='[0-1024]', help='(Optional) Victim Cache Sizes(lines), 0: no victim cache')
+    parser.add_argument('-lru', type=str, choices=Config.LRU_VALID, default='chain', help='(Optional) LRU backend {}'.format(Config.LRU_VALID))
+    parser.add_argument('-j', type=int, default=os.cpu_count(), help='(Optional) Number of worker processes, default: all cores')
+    parser.add_argument('--fanout', action='store_true', help='(Optional) Read and parse every trace once for all its configurations instead of once per configuration')
+    parser.add_argument('-o', required=True, type=str, help='Output file, .json for json, csv otherwise')
+
+    return parser
+# end
+
+
+def main(argv):
+    args = generate_parser().parse_known_args(argv)[0]
+
+    configs = generate_configs(args.i, args.cs, args.bs, args.w, args.v, args.lru)
+    results = run_sweep(configs, args.j, args.fanout)
+    write_results(results, args.o)
+
+    print('{} configurations -> {}'.format(len(results), args.o))
+# end
+
+if __name__ == "__main__":
+    main(sys.argv)
+# end
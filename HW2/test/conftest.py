@@ -0,0 +1,20 @@
+import os
+import sys
+
+# the modules of HW2 are flat, imported from the directory above this one
+PATH_HW2 = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PATH_HW2 not in sys.path:
+    sys.path.insert(0, PATH_HW2)
+# end
+
+import pytest
+
+
+PATH_TRACE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'trace-4K.memtrace')
+
+
+@pytest.fixture
+def path_trace():
+    # 4000 synthetic accesses (loads and stores around a few bases, with offsets)
+    return PATH_TRACE
+# end
@@ -0,0 +1,98 @@
+import random
+import sys
+
+import pytest
+
+from cache import LineDataWayCache, FullyAssociativeCache
+from lru_module import NwayLRU, ArrayLRU
+from main import Config, run
+from policy_module import ReplacementPolicy
+from functools import partial
+
+
+N_WAYS_NEVER_HASHED = 1 << 30
+
+
+def make_klass_lru(policy):
+    if policy == 'lru':
+        return NwayLRU
+    # end
+    return partial(ReplacementPolicy.get_policy_klass(policy), seed=0)
+# end
+
+
+# configs wide enough to be hashed: set-associative, fully associative with a policy, wide victim caches
+@pytest.mark.parametrize('cs,bs,w,v,policy', [
+    (8, 16, 64, 0, 'lru'),
+    (4, 16, 32, 0, 'srrip'),
+    (2, 8, 0, 0, 'plru'),
+    (2, 8, 0, 0, 'fifo'),
+    (2, 8, 0, 0, 'lfu'),
+    (2, 8, 0, 0, 'random'),
+    (4, 16, 1, 32, 'lru'),
+    (4, 16, 2, 64, 'brrip'),
+])
+@pytest.mark.parametrize('engine', Config.ENGINE_VALID)
+def test_hashed_and_scanning_counts_equal(path_trace, monkeypatch, cs, bs, w, v, policy, engine):
+    config = Config(i=path_trace, cs=cs, bs=bs, w=w, v=v, policy=policy, engine=engine)
+    result_hashed = run(config)
+    monkeypatch.setattr(LineDataWayCache, 'N_WAYS_HASHED_MIN', N_WAYS_NEVER_HASHED)
+    result_scanned = run(config)
+    assert (result_hashed.hits, result_hashed.misses) == (result_scanned.hits, result_scanned.misses)
+    assert result_hashed.victim_hits == result_scanned.victim_hits
+# end
+
+
+@pytest.mark.parametrize('policy', ['lru', 'plru', 'srrip', 'fifo', 'lfu'])
+def test_hashed_lookup_follows_scanning_with_invalidations(policy):
+    # same random loads, stores and invalidations on two caches, one hashed: same ways picked at every step
+    n_lines, n_ways = 2, 64
+    cache_hashed = LineDataWayCache(n_lines, 1, n_ways, 16, make_klass_lru(policy))
+    cache_scanned = LineDataWayCache(n_lines, 1, n_ways, 16, make_klass_lru(policy))
+    cache_scanned.is_hashed = False
+    assert cache_hashed.is_hashed
+
+    rng = random.Random(3)
+    for _ in range(5000):
+        index, tag = rng.randrange(n_lines), rng.randrange(3 * n_ways)
+        if rng.random() < 0.2:
+            assert cache_hashed.invalidate(index, 0, tag) == cache_scanned.invalidate(index, 0, tag)
+            continue
+        # end
+
+        indicate_hashed, least_hashed = cache_hashed.lookup(index, 0, tag)
+        indicate_scanned, least_scanned = cache_scanned.lookup(index, 0, tag)
+        assert indicate_hashed == indicate_scanned
+        if not cache_hashed.is_a_miss(indicate_hashed):
+            cache_hashed.touch(index, indicate_hashed)
+            cache_scanned.touch(index, indicate_scanned)
+            continue
+        # end
+
+        assert least_hashed == least_scanned
+        cache_hashed.store_direct(index, 0, tag, least_hashed)
+        cache_scanned.store_direct(index, 0, tag, least_scanned)
+    # end
+# end
+
+
+def test_hashing_skipped_when_least_is_a_scan():
+    # ArrayLRU finds its least way with an argmin over the line, hashing the tags would not make a miss O(1)
+    assert LineDataWayCache(1, 1, 64, 16, NwayLRU).is_hashed
+    assert not LineDataWayCache(1, 1, 64, 16, ArrayLRU).is_hashed
+# end
+
+
+def test_memory_usage_counts_the_entries():
+    # a full fully-associative cache: every entry holds a tag and a way object besides its dict slot
+    n_ways = 256
+    cache = FullyAssociativeCache(n_ways, 16, 24)
+    for tag in range(1000, 1000 + n_ways):
+        _, indicate_least = cache.lookup(0, 0, tag)
+        cache.store_direct(0, 0, tag, indicate_least)
+    # end
+    usage = cache.memory_usage()
+    assert usage['entries'] >= sys.getsizeof(cache.entries) + n_ways * 2 * sys.getsizeof(0)
+    assert 'index' in LineDataWayCache(1, 1, 64, 16, NwayLRU).memory_usage()
+    assert 'index' not in LineDataWayCache(1, 1, 4, 16, NwayLRU).memory_usage()
+# end
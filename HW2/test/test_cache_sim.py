@@ -0,0 +1,53 @@
+import bz2
+import gzip
+import lzma
+import subprocess
+import sys
+
+import pytest
+
+from cache_sim import run_sim
+from conftest import PATH_HW2
+from memtrace import convert
+from test_engines import COUNTS_BASELINE
+
+
+MODULES_COMPRESSION = {'gz': gzip, 'xz': lzma, 'bz2': bz2}
+
+
+@pytest.fixture
+def paths_trace(path_trace, tmp_path):
+    # the trace as text and binary, plain and compressed
+    path_binary = str(tmp_path / 'trace.bin')
+    convert(path_trace, path_binary)
+    paths = {'text': path_trace, 'binary': path_binary}
+    for name_format, path in list(paths.items()):
+        for compression, module in MODULES_COMPRESSION.items():
+            path_compressed = '{}.{}'.format(path_binary if name_format == 'binary' else str(tmp_path / 'trace.memtrace'), compression)
+            with open(path, 'rb') as file, module.open(path_compressed, 'wb') as file_compressed:
+                file_compressed.write(file.read())
+            # end
+            paths['{}-{}'.format(name_format, compression)] = path_compressed
+        # end
+    # end
+    return paths
+# end
+
+
+@pytest.mark.parametrize('cs,bs,w', [config[:3] for config in COUNTS_BASELINE if config[3] == 0 and config[0] > 1])
+def test_run_sim_matches_baseline_in_every_format(paths_trace, cs, bs, w):
+    hits, misses = COUNTS_BASELINE[(cs, bs, w, 0)]
+    for path in paths_trace.values():
+        cache = run_sim(path, cs, bs, w, verbose=False)
+        assert (cache.hits, cache.misses) == (hits, misses), path
+    # end
+# end
+
+
+def test_cache_sim_runs_without_numpy(paths_trace):
+    # numpy made unimportable: cache_sim.py must still read every format
+    code = 'import sys; sys.modules["numpy"] = None; import cache_sim; ' \
+        'print(*[cache_sim.run_sim(path, 4, 16, 1, verbose=False).hits for path in sys.argv[1:]])'
+    output = subprocess.run([sys.executable, '-c', code, *paths_trace.values()], cwd=PATH_HW2, capture_output=True, text=True, check=True)
+    assert output.stdout.split() == [str(COUNTS_BASELINE[(4, 16, 1, 0)][0])] * len(paths_trace)
+# end
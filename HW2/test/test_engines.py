@@ -0,0 +1,71 @@
+import pytest
+
+from actions import BatchExecutor
+from factory import generate_components
+from main import Config, run
+from memtrace import read_chunks
+
+
+# (cs, bs, w, v) -> (hits, misses) printed by main.py of the baseline commit for data/trace-4K.memtrace
+COUNTS_BASELINE = {
+    (4, 16, 1, 0): (1020, 2980),
+    (4, 16, 1, 8): (2084, 1916),
+    (8, 32, 4, 0): (1633, 2367),
+    (8, 32, 4, 4): (1925, 2075),
+    (2, 8, 2, 16): (1472, 2528),
+    (16, 64, 8, 2): (2307, 1693),
+    (4, 16, 0, 0): (1061, 2939),
+    (1, 4, 16, 0): (427, 3573),
+    (32, 16, 16, 0): (1925, 2075),
+}
+CONFIGS_BASELINE = list(COUNTS_BASELINE)
+
+
+def run_executor(path_trace, cs, bs, w, v, lru='chain', is_fast=True):
+    cache, victim, decoder = generate_components(cs, bs, w, v, lru=lru)
+    executor = BatchExecutor(cache, victim)
+    executor.is_fast = executor.is_fast and is_fast
+    for ops, addresses in read_chunks(path_trace, 1000):
+        executor.execute(*decoder.decode_addresses(ops, addresses)[:3])
+    # end
+    executor.sync()
+    return executor.stats
+# end
+
+
+@pytest.mark.parametrize('cs,bs,w,v', CONFIGS_BASELINE)
+@pytest.mark.parametrize('engine', Config.ENGINE_VALID)
+def test_run_matches_baseline(path_trace, cs, bs, w, v, engine):
+    result = run(Config(i=path_trace, cs=cs, bs=bs, w=w, v=v, engine=engine))
+    assert (result.hits, result.misses) == COUNTS_BASELINE[(cs, bs, w, v)]
+    assert result.accesses == 4000
+# end
+
+
+@pytest.mark.parametrize('cs,bs,w,v', CONFIGS_BASELINE)
+def test_victim_hits_same_in_both_engines(path_trace, cs, bs, w, v):
+    results = [run(Config(i=path_trace, cs=cs, bs=bs, w=w, v=v, engine=engine)) for engine in Config.ENGINE_VALID]
+    assert results[0].victim_hits == results[1].victim_hits
+    assert (results[0].victim_hits > 0) == (v > 0)
+# end
+
+
+@pytest.mark.parametrize('cs,bs,w,v', [config for config in CONFIGS_BASELINE if config[2] > 0])
+@pytest.mark.parametrize('lru', Config.LRU_VALID)
+@pytest.mark.parametrize('is_fast', [True, False])
+def test_executor_paths_match_baseline(path_trace, cs, bs, w, v, lru, is_fast):
+    stats = run_executor(path_trace, cs, bs, w, v, lru, is_fast)
+    hits, misses = COUNTS_BASELINE[(cs, bs, w, v)]
+    assert stats.counted_miss == misses
+    assert stats.count_all() - stats.counted_miss == hits
+# end
+
+
+@pytest.mark.parametrize('cs,bs,w,v', CONFIGS_BASELINE)
+def test_executor_fast_and_generic_agree(path_trace, cs, bs, w, v):
+    stats_fast = run_executor(path_trace, cs, bs, w, v, is_fast=True)
+    stats_generic = run_executor(path_trace, cs, bs, w, v, is_fast=False)
+    assert stats_fast.counted_miss == stats_generic.counted_miss
+    assert stats_fast.counted_victim_hit == stats_generic.counted_victim_hit
+    assert dict(stats_fast.counted_action) == dict(stats_generic.counted_action)
+# end
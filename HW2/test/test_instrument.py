@@ -0,0 +1,27 @@
+import numpy as np
+
+from main import Config, run
+from instrument import CacheInstrument
+
+
+def test_reuse_time_counts_accesses_not_distinct_blocks():
+    # A B B B A: A comes back after 3 accesses but only 1 distinct block, the reuse time is 3
+    instrument = CacheInstrument(1, 0)
+    instrument.record_accesses([1, 2, 2, 2, 1], [0] * 5)
+    histogram = instrument.histogram_reuse_time
+    assert histogram[0] == 2        # B back to back, twice
+    assert histogram[2] == 1        # time 3 in [2, 4)
+    assert histogram.sum() == 3
+    assert instrument.count_first_touch == 2
+# end
+
+
+def test_instrument_saves_reuse_time_histogram(path_trace, tmp_path):
+    path_npz = str(tmp_path / 'sets.npz')
+    result = run(Config(i=path_trace, cs=4, bs=16, w=4, instrument=path_npz))
+    with np.load(path_npz) as saved:
+        assert 'reuse_time_histogram' in saved.files
+        assert saved['reuse_time_histogram'].sum() + saved['reuse_first_touch'] == result.accesses
+        assert saved['misses_set'].sum() == result.misses
+    # end
+# end
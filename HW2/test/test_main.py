@@ -0,0 +1,24 @@
+import pytest
+
+from main import Config, parse_args, run
+
+
+def test_sample_reports_fraction_of_sets_simulated(path_trace):
+    # 4 KB of 16 B blocks in 4 ways: 64 sets, 0.3 of them rounds to 19 sets
+    result = run(Config(i=path_trace, cs=4, bs=16, w=4, sample=0.3))
+    assert result.fraction_sampled == 19 / 64
+# end
+
+
+def test_sample_scales_stall_cycles_with_misses(path_trace):
+    result = run(Config(i=path_trace, cs=4, bs=16, w=4, sample=0.3, lat_mem=100))
+    assert result.stall_cycles == 100 * result.misses
+# end
+
+
+@pytest.mark.parametrize('wp', ['wb', 'wt'])
+def test_sample_rejected_with_write_policy(path_trace, wp):
+    with pytest.raises(SystemExit):
+        parse_args(['-i', path_trace, '-cs', '4', '-bs', '16', '-w', '4', '-sample', '0.5', '-wp', wp])
+    # end
+# end
@@ -0,0 +1,109 @@
+import bz2
+import gzip
+import lzma
+import threading
+
+import numpy as np
+import pytest
+
+from main import Config, run
+from memtrace import ThreadedReader, convert, open_decompressed, read_chunks_from, read_trace
+
+
+MODULES_COMPRESSION = {'gz': gzip, 'xz': lzma, 'bz2': bz2}
+
+
+def compress(path, path_compressed, module):
+    with open(path, 'rb') as file, module.open(path_compressed, 'wb') as file_compressed:
+        file_compressed.write(file.read())
+    # end
+# end
+
+
+@pytest.fixture
+def path_binary(path_trace, tmp_path):
+    path = str(tmp_path / 'trace.bin')
+    convert(path_trace, path)
+    return path
+# end
+
+
+@pytest.mark.parametrize('compression', list(MODULES_COMPRESSION))
+@pytest.mark.parametrize('is_binary', [False, True])
+def test_compressed_round_trip(path_trace, path_binary, tmp_path, compression, is_binary):
+    path = path_binary if is_binary else path_trace
+    path_compressed = str(tmp_path / 'trace.{}'.format(compression))
+    compress(path, path_compressed, MODULES_COMPRESSION[compression])
+
+    ops, addresses = read_trace(path_trace)
+    ops_compressed, addresses_compressed = read_trace(path_compressed)
+    assert ops.size == 4000
+    assert np.array_equal(ops, ops_compressed)
+    assert np.array_equal(addresses, addresses_compressed)
+# end
+
+
+def truncate_compressed(path_trace, tmp_path, compression):
+    # -> compressed trace cut in its middle, the decompressor fails before the end of the stream
+    path_compressed = str(tmp_path / 'trace.{}'.format(compression))
+    compress(path_trace, path_compressed, MODULES_COMPRESSION[compression])
+    with open(path_compressed, 'rb') as file:
+        content = file.read()
+    # end
+    with open(path_compressed, 'wb') as file:
+        file.write(content[:len(content) // 2])
+    # end
+    return path_compressed
+# end
+
+
+@pytest.mark.parametrize('compression', list(MODULES_COMPRESSION))
+def test_corrupt_compressed_trace_raises_value_error(path_trace, tmp_path, compression):
+    path_corrupt = truncate_compressed(path_trace, tmp_path, compression)
+    with pytest.raises(ValueError, match='corrupt compressed trace'):
+        read_trace(path_corrupt)
+    # end
+# end
+
+
+@pytest.mark.parametrize('compression', list(MODULES_COMPRESSION))
+def test_threaded_reader_raises_again_after_the_error(path_trace, tmp_path, compression):
+    path_corrupt = truncate_compressed(path_trace, tmp_path, compression)
+    errors = []
+
+    def read_twice():
+        with ThreadedReader(open_decompressed(path_corrupt), path_corrupt) as reader:
+            for _ in range(2):
+                try:
+                    while reader.read(1 << 16):
+                        pass
+                    # end
+                except ValueError as e:
+                    errors.append(e)
+                # end
+            # end
+        # end
+    # end
+
+    # a read after the error used to wait for the dead reader thread forever
+    thread = threading.Thread(target=read_twice, daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+    assert not thread.is_alive()
+    assert len(errors) == 2
+# end
+
+
+def test_record_limit_skips_blank_lines(path_trace, tmp_path):
+    # a blank line after each of the first 50 records: --stop-at 100 still stops after 100 records
+    path_blank = str(tmp_path / 'blank.memtrace')
+    with open(path_trace) as file, open(path_blank, 'w') as file_blank:
+        file_blank.write(file.read().replace('\n', '\n\n', 50))
+    # end
+
+    chunks = list(read_chunks_from(path_blank, num_record_chunk=7, num_record_limit=100))
+    assert sum(ops.size for ops, _, _ in chunks) == 100
+    ops, _ = read_trace(path_trace)
+    assert np.array_equal(np.concatenate([ops for ops, _, _ in chunks]), ops[:100])
+    assert run(Config(i=path_blank, cs=4, bs=16, w=1, stop_at=100)).accesses == 100
+# end
@@ -0,0 +1,47 @@
+import gzip
+import multiprocessing
+import os
+
+import pytest
+
+import parallel
+from main import Config, run
+from memtrace import convert
+
+
+@pytest.fixture
+def paths_trace(path_trace, tmp_path):
+    # the same trace as text, gzip text and plain binary
+    path_gz = str(tmp_path / 'trace.memtrace.gz')
+    with open(path_trace, 'rb') as file, gzip.open(path_gz, 'wb') as file_gz:
+        file_gz.write(file.read())
+    # end
+    path_binary = str(tmp_path / 'trace.bin')
+    convert(path_trace, path_binary)
+    return {'text': path_trace, 'gz': path_gz, 'binary': path_binary}
+# end
+
+
+@pytest.mark.parametrize('format_trace', ['text', 'gz', 'binary'])
+@pytest.mark.parametrize('cs,bs,w,wp', [(4, 16, 1, ''), (8, 32, 4, 'wb'), (16, 64, 8, 'wt')])
+def test_jobs_match_one_job(paths_trace, format_trace, cs, bs, w, wp):
+    path = paths_trace[format_trace]
+    result_one = run(Config(i=path, cs=cs, bs=bs, w=w, write_policy=wp))
+    result_jobs = run(Config(i=path, cs=cs, bs=bs, w=w, write_policy=wp, jobs=3))
+    assert (result_jobs.hits, result_jobs.misses, result_jobs.accesses) == (result_one.hits, result_one.misses, result_one.accesses)
+    assert (result_jobs.bytes_read, result_jobs.bytes_written, result_jobs.writebacks) == (result_one.bytes_read, result_one.bytes_written, result_one.writebacks)
+# end
+
+
+def exit_worker(config, num_part, connection):
+    os._exit(3)
+# end
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork', reason='the patched worker only reaches forked processes')
+def test_dead_worker_names_its_partition(path_trace, monkeypatch):
+    monkeypatch.setattr(parallel, 'run_partition_fed', exit_worker)
+    with pytest.raises(RuntimeError, match=r'worker of partition \d of 2 died \(exit code 3\)'):
+        parallel.run_partitioned(Config(i=path_trace, cs=4, bs=16, w=1, jobs=2), 2)
+    # end
+# end
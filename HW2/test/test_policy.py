@@ -0,0 +1,170 @@
+import random
+import pytest
+
+from policy_module import ReplacementPolicy
+
+
+# plain python models of the policies, one line each, checked against get_least after every call
+
+class ModelPLRU:
+    def __init__(self, n_ways):
+        self.n_ways = n_ways
+        self.bits = {}  # node -> 0: least on the left, 1: on the right
+    # end
+
+    def _walk(self, id_way, toward):
+        node, size = 0, self.n_ways
+        while size > 1:
+            size //= 2
+            direction = 1 if id_way % (2 * size) >= size else 0
+            self.bits[node] = direction if toward else 1 - direction
+            node = 2 * node + 1 + direction
+        # end
+    # end
+
+    def touch(self, id_way):
+        self._walk(id_way, False)
+    # end
+
+    def insert(self, id_way):
+        self._walk(id_way, False)
+    # end
+
+    def set_least(self, id_way):
+        self._walk(id_way, True)
+    # end
+
+    def get_least(self):
+        node, id_way, size = 0, 0, self.n_ways
+        while size > 1:
+            size //= 2
+            direction = self.bits.get(node, 0)
+            id_way += direction * size
+            node = 2 * node + 1 + direction
+        # end
+        return id_way
+    # end
+# end
+
+
+class ModelSRRIP:
+    RRPV_MAX = 3
+
+    def __init__(self, n_ways):
+        self.rrpv = [self.RRPV_MAX] * n_ways
+    # end
+
+    def touch(self, id_way):
+        self.rrpv[id_way] = 0
+    # end
+
+    def insert(self, id_way):
+        while max(self.rrpv) < self.RRPV_MAX:  # age one step at a time
+            self.rrpv = [rrpv + 1 for rrpv in self.rrpv]
+        # end
+        self.rrpv[id_way] = self.RRPV_MAX - 1
+    # end
+
+    def set_least(self, id_way):
+        self.rrpv[id_way] = self.RRPV_MAX
+    # end
+
+    def get_least(self):
+        return self.rrpv.index(max(self.rrpv))
+    # end
+# end
+
+
+class ModelFIFO:
+    def __init__(self, n_ways):
+        self.order = list(range(n_ways))    # least -> most recently filled
+    # end
+
+    def touch(self, id_way):
+        pass
+    # end
+
+    def insert(self, id_way):
+        self.order.remove(id_way)
+        self.order.append(id_way)
+    # end
+
+    def set_least(self, id_way):
+        self.order.remove(id_way)
+        self.order.insert(0, id_way)
+    # end
+
+    def get_least(self):
+        return self.order[0]
+    # end
+# end
+
+
+class ModelLFU:
+    def __init__(self, n_ways):
+        self.counts = [0] * n_ways
+    # end
+
+    def touch(self, id_way):
+        self.counts[id_way] += 1
+    # end
+
+    def insert(self, id_way):
+        self.counts[id_way] = 1
+    # end
+
+    def set_least(self, id_way):
+        self.counts[id_way] = min(self.counts) - 1
+    # end
+
+    def get_least(self):
+        return self.counts.index(min(self.counts))
+    # end
+# end
+
+
+MODELS_POLICY = {'plru': ModelPLRU, 'srrip': ModelSRRIP, 'fifo': ModelFIFO, 'lfu': ModelLFU}
+
+
+@pytest.mark.parametrize('name_policy', list(MODELS_POLICY))
+@pytest.mark.parametrize('n_ways', [1, 2, 4, 16, ReplacementPolicy.N_WAYS_WIDE_MIN, 256])
+def test_victim_order_matches_model(name_policy, n_ways):
+    n_lines = 3
+    policy = ReplacementPolicy.get_policy_klass(name_policy)(n_lines, n_ways)
+    models = [MODELS_POLICY[name_policy](n_ways) for _ in range(n_lines)]
+    rng = random.Random(n_ways)
+
+    for _ in range(3000):
+        id_line = rng.randrange(n_lines)
+        model = models[id_line]
+        draw = rng.random()
+        if draw < 0.4:
+            id_way = rng.randrange(n_ways)
+            policy.touch(id_line, id_way)
+            model.touch(id_way)
+        elif draw < 0.8:    # a fill of the victim, as a miss does
+            id_way = policy.get_least(id_line)
+            policy.insert(id_line, id_way)
+            model.insert(id_way)
+        elif draw < 0.9:
+            id_way = rng.randrange(n_ways)
+            policy.insert(id_line, id_way)
+            model.insert(id_way)
+        else:
+            id_way = rng.randrange(n_ways)
+            policy.set_least(id_line, id_way)
+            model.set_least(id_way)
+        # end
+        assert policy.get_least(id_line) == model.get_least()
+    # end
+# end
+
+
+@pytest.mark.parametrize('name_policy', ReplacementPolicy.list_policies())
+def test_wide_line_is_built_fast(name_policy):
+    # a fully associative cache of 2M ways used to take seconds per policy to set up
+    policy = ReplacementPolicy.get_policy_klass(name_policy)(1, 1 << 21)
+    policy.insert(0, policy.get_least(0))
+    policy.touch(0, 5)
+    assert 0 <= policy.get_least(0) < 1 << 21
+# end
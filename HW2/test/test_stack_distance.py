@@ -0,0 +1,39 @@
+import pytest
+
+from main import Config, run
+from memtrace import read_trace
+from stack_distance import StackDistanceEngine, generate_configs, simulate_all
+
+
+LIST_CS = [1, 2, 4, 8]
+
+
+@pytest.mark.parametrize('bs', [4, 16, 64])
+def test_table_matches_main(path_trace, bs):
+    _, addresses = read_trace(path_trace)
+    results = simulate_all(addresses, bs, LIST_CS)
+    assert len(results) == len(generate_configs(bs, LIST_CS))
+    for result in results:
+        result_main = run(Config(i=path_trace, cs=result['cs'], bs=bs, w=result['w']))
+        assert (result['hits'], result['misses']) == (result_main.hits, result_main.misses), result
+    # end
+# end
+
+
+def test_compaction_keeps_the_distances(path_trace):
+    # a tree with room for 64 slots is renumbered many times over 4000 accesses, fed in uneven chunks
+    _, addresses = read_trace(path_trace)
+    engine_large = StackDistanceEngine(16, [0])
+    engine_large.feed(addresses)
+    engine_small = StackDistanceEngine(16, [0], size_tree=64)
+    for start in range(0, addresses.size, 333):
+        engine_small.feed(addresses[start:start + 333])
+    # end
+
+    assert len(engine_small.tree) < addresses.size
+    assert engine_small.histogram_fa == engine_large.histogram_fa
+    assert engine_small.num_access == engine_large.num_access == addresses.size
+    for n_ways in [1, 16, 256, 4096]:
+        assert engine_small.count_hits(0, n_ways) == engine_large.count_hits(0, n_ways)
+    # end
+# end